@@ -44,3 +44,83 @@ def test_admin_update_content(user_client, wiki_user):
     assert notification["title"] == page_title
     assert notification["url"] == page_url
     assert notification["text"] == "Page updated (see PR!mdn/content!14607!!)"
+
+
+def test_admin_update_deduplicates_notification_data(
+    user_client, wiki_user, mock_requests, settings
+):
+    baker.make(
+        models.Watch,
+        users=[wiki_user],
+        title="<dialog>",
+        url="/en-us/docs/web/html/element/dialog",
+        path="html.elements.dialog",
+    )
+    changes = [
+        {
+            "event": "added_stable",
+            "path": "html.elements.dialog.open",
+            "browsers": [
+                {"browser": "firefox", "version": "98"},
+                {"browser": "firefox_android", "version": "98"},
+            ],
+        }
+    ]
+    mock_requests.get(settings.NOTIFICATIONS_CHANGES_URL + "changes.json", json=changes)
+
+    url = reverse("admin_api:admin.update")
+    auth_headers = {
+        "HTTP_AUTHORIZATION": f"Bearer {settings.NOTIFICATIONS_ADMIN_TOKEN}",
+    }
+    for _ in range(2):
+        response = user_client.post(
+            url,
+            json.dumps({"filename": "changes.json"}),
+            content_type="application/json",
+            **auth_headers,
+        )
+        assert response.status_code == 200
+
+    notification_data = models.NotificationData.objects.get()
+    assert notification_data.title == "dialog.open"
+    assert notification_data.content_hash == notification_data.compute_content_hash()
+    assert (
+        models.Notification.objects.filter(
+            user=wiki_user, notification=notification_data
+        ).count()
+        == 2
+    )
+
+
+def test_admin_update_notifies_ancestor_watchers(
+    user_client, wiki_user, mock_requests, settings
+):
+    for path in ("html.elements", "html.elements.dialog", "html.elements.dialogs"):
+        baker.make(
+            models.Watch,
+            users=[wiki_user],
+            title=path,
+            url=f"/en-us/docs/{path}",
+            path=path,
+        )
+    changes = [
+        {
+            "event": "added_subfeatures",
+            "path": "html.elements.dialog.open",
+            "subfeatures": ["html.elements.dialog.open.modal"],
+        }
+    ]
+    mock_requests.get(settings.NOTIFICATIONS_CHANGES_URL + "changes.json", json=changes)
+
+    response = user_client.post(
+        reverse("admin_api:admin.update"),
+        json.dumps({"filename": "changes.json"}),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=f"Bearer {settings.NOTIFICATIONS_ADMIN_TOKEN}",
+    )
+    assert response.status_code == 200
+
+    assert dict(models.NotificationData.objects.values_list("page_url", "title")) == {
+        "/en-us/docs/html.elements": "elements.dialog.open",
+        "/en-us/docs/html.elements.dialog": "dialog.open",
+    }
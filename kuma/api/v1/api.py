@@ -4,12 +4,18 @@ from ninja import NinjaAPI
 from ratelimit.exceptions import Ratelimited
 
 from .auth import admin_auth, profile_auth
+from .etags import set_etag
 
 
 class NoCacheNinjaAPI(NinjaAPI):
-    def create_response(self, *args, **kwargs) -> HttpResponse:
-        response = super().create_response(*args, **kwargs)
-        add_never_cache_headers(response)
+    def create_response(self, request, *args, **kwargs) -> HttpResponse:
+        response = super().create_response(request, *args, **kwargs)
+        # Views with an ETag (see `etags.conditional`) can be revalidated.
+        etag = getattr(request, "etag", None)
+        if etag and response.status_code == 200:
+            set_etag(response, etag)
+        else:
+            add_never_cache_headers(response)
         return response
 
 
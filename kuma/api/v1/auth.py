@@ -1,34 +1,69 @@
 from __future__ import annotations
 
+import hashlib
+import time
 from typing import Any
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.http import HttpRequest
 from ninja.security import HttpBearer, SessionAuth
 
 from kuma.users.auth import KumaOIDCAuthenticationBackend, is_authorized_request
 from kuma.users.models import UserProfile
 
+# Verified bearer tokens are remembered for at most this long (in seconds),
+# or until they expire.
+TOKEN_CACHE_KEY = "api:bearer-token:{}"
+TOKEN_CACHE_TIMEOUT = 60 * 5
+
 
 class NotASubscriber(Exception):
     pass
 
 
+def authorize_bearer_token(access_token):
+    """
+    Return the user of a bearer token, verifying it and creating or updating
+    the user only the first time the token is used.
+
+    Users that were disabled or deleted since are never authorized.
+    """
+    key = TOKEN_CACHE_KEY.format(hashlib.sha256(access_token.encode()).hexdigest())
+    if (verified := cache.get(key)) and verified["exp"] > time.time():
+        user = (
+            get_user_model()
+            .objects.filter(pk=verified["user_id"], is_active=True)
+            .first()
+        )
+        if user is None:
+            cache.delete(key)
+            raise NotASubscriber("user is disabled")
+        return user
+
+    payload = is_authorized_request(access_token)
+    if error := payload.get("error"):
+        raise NotASubscriber(error)
+
+    # create user if there is not one
+    user = KumaOIDCAuthenticationBackend.create_or_update_subscriber(payload)
+    if not user.is_active:
+        # E.g. because they are being deleted.
+        raise NotASubscriber("user is disabled")
+    timeout = min(TOKEN_CACHE_TIMEOUT, int(payload["exp"] - time.time()))
+    if timeout > 0:
+        cache.set(key, {"user_id": user.id, "exp": payload["exp"]}, timeout)
+    return user
+
+
 def is_subscriber(request, raise_error=False) -> bool:
     try:
         user = request.user
         if user.is_authenticated:
             return True
         if access_token := request.META.get("HTTP_AUTHORIZATION"):
-            payload = is_authorized_request(access_token)
-
-            if error := payload.get("error"):
-                raise NotASubscriber(error)
-
-            # create user if there is not one
-            request.user = KumaOIDCAuthenticationBackend.create_or_update_subscriber(
-                payload
-            )
+            request.user = authorize_bearer_token(access_token)
             return True
         raise NotASubscriber("not a subscriber")
     except NotASubscriber:
@@ -0,0 +1,58 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from kuma.core.utils import get_versions
+
+
+def set_etag(response, etag):
+    response["ETag"] = etag
+    # Clients may keep the response, as long as they check it's still fresh.
+    patch_cache_control(response, private=True, no_cache=True, max_age=0)
+
+
+def make_etag(request, versions):
+    profile = request.auth
+    content = [
+        request.get_full_path(),
+        versions,
+        # The responses include a CSRF token and the subscription status.
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+        getattr(profile, "is_subscriber", None),
+    ]
+    digest = hashlib.sha256(json.dumps(content).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def conditional(*names, shared=()):
+    """
+    Give the responses of a view a weak ETag based on the versions of the
+    user's `names` data, and of the `shared` data, it's made of (see
+    `kuma.core.utils.bump_versions`). When the request's If-None-Match has
+    the same ETag, respond with a 304 without running the view.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            scopes = [(name, request.user.id) for name in names]
+            scopes += [(name, None) for name in shared]
+            versions = get_versions(scopes)
+            etag = make_etag(request, [versions[scope] for scope in scopes])
+            if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+            if etag.removeprefix("W/") in (e.removeprefix("W/") for e in if_none_match):
+                response = HttpResponseNotModified()
+                set_etag(response, etag)
+                return response
+            # Set on the response by `NoCacheNinjaAPI.create_response`.
+            request.etag = etag
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
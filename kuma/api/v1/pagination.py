@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-from typing import Generic, TypeVar
+import base64
+import datetime
+import json
+from typing import Generic, Optional, TypeVar
 
 from django.conf import settings
-from django.db.models import QuerySet
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
 from django.http import HttpRequest
 from django.middleware.csrf import get_token
 from ninja import Field
+from ninja.errors import HttpError
 from ninja.pagination import LimitOffsetPagination
 from ninja.schema import Schema
 from pydantic.generics import GenericModel
@@ -40,22 +46,117 @@ class PaginatedResponse(Schema, GenericModel, Generic[ItemSchema]):
 class LimitOffsetPaginatedData:
     items: QuerySet | list
     csrfmiddlewaretoken: str
-
-    def __init__(self, items: QuerySet | list, csrfmiddlewaretoken: str):
+    next_cursor: str | None
+
+    def __init__(
+        self,
+        items: QuerySet | list,
+        csrfmiddlewaretoken: str,
+        next_cursor: str | None = None,
+    ):
         self.items = items
         self.csrfmiddlewaretoken = csrfmiddlewaretoken
+        self.next_cursor = next_cursor
 
 
 class LimitOffsetPaginatedResponse(Schema, GenericModel, Generic[ItemSchema]):
     items: list[ItemSchema]
     csrfmiddlewaretoken: str
+    next_cursor: Optional[str]
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    Like `DjangoJSONEncoder`, but keeping the microseconds of datetimes, which
+    the cursor must match exactly to not skip rows.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(
+        json.dumps(values, cls=CursorEncoder).encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str) -> list | None:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
 
 
 class LimitOffsetPaginationWithMeta(LimitOffsetPagination):
+    """
+    Limit/offset pagination which can opt in to keyset pagination.
+
+    When constructed with ``keyset`` (the ordering of the queryset, e.g.
+    ``("-created", "id")``) and the queryset is ordered exactly like that,
+    responses carry a ``next_cursor`` which clients can pass back as
+    ``cursor`` instead of an ``offset``. That turns deep pages into an
+    index range scan rather than counting past every skipped row.
+    """
+
+    class Input(LimitOffsetPagination.Input):
+        cursor: str = None
+
+    def __init__(self, keyset: tuple[str, ...] = (), **kwargs):
+        super().__init__(**kwargs)
+        self.keyset = tuple(keyset)
+
     def paginate_queryset(
         self, items: QuerySet, request: HttpRequest, **params
     ) -> LimitOffsetPaginatedData:
-        paginated_items = super().paginate_queryset(items, request, **params)
+        csrfmiddlewaretoken = get_token(request)
+        if not self.keyset or tuple(items.query.order_by) != self.keyset:
+            paginated_items = super().paginate_queryset(items, request, **params)
+            return LimitOffsetPaginatedData(
+                paginated_items, csrfmiddlewaretoken=csrfmiddlewaretoken
+            )
+
+        pagination = params["pagination"]
+        if pagination.cursor:
+            values = decode_cursor(pagination.cursor)
+            if values is None or len(values) != len(self.keyset):
+                raise HttpError(400, "Invalid cursor")
+            try:
+                items = items.filter(self.keyset_filter(values))
+            except (ValidationError, ValueError, TypeError):
+                raise HttpError(400, "Invalid cursor")
+            paginated_items = list(items[: pagination.limit])
+        else:
+            paginated_items = list(super().paginate_queryset(items, request, **params))
+
+        next_cursor = None
+        if len(paginated_items) == pagination.limit:
+            next_cursor = encode_cursor(
+                [self.keyset_value(paginated_items[-1], field) for field in self.keyset]
+            )
         return LimitOffsetPaginatedData(
-            paginated_items, csrfmiddlewaretoken=get_token(request)
+            paginated_items,
+            csrfmiddlewaretoken=csrfmiddlewaretoken,
+            next_cursor=next_cursor,
         )
+
+    def keyset_filter(self, values: list) -> Q:
+        """Match the rows strictly after ``values`` in the keyset ordering."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.keyset, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def keyset_value(item, field: str):
+        value = item
+        for attr in field.lstrip("-").split("__"):
+            value = getattr(value, attr)
+        return value
@@ -1,18 +1,24 @@
 from datetime import datetime
 from typing import Optional, Union
 
-from django.conf import settings
-from django.db.models import Case, CharField, F, Q, When
-from django.db.models.functions import Cast
+from django.db.models import Q
 from django.middleware.csrf import get_token
 from django.utils import timezone
 from ninja import Field, Form, Query, Router
 from pydantic import validator
 
+from kuma.api.v1.etags import conditional
 from kuma.api.v1.plus.notifications import NotOk
 from kuma.api.v1.smarter_schema import Schema
 from kuma.bookmarks.models import Bookmark
-from kuma.documenturls.models import DocumentURL, download_url
+from kuma.bookmarks.utils import (
+    adjust_bookmark_count,
+    get_bookmark_count,
+    reserve_bookmark_count,
+)
+from kuma.core.utils import bump_versions
+from kuma.documenturls.models import DocumentURL
+from kuma.documenturls.utils import get_or_create_documenturl
 from kuma.settings.common import MAX_NON_SUBSCRIBED
 from kuma.users.models import UserProfile
 
@@ -90,6 +96,7 @@ class CollectionPaginatedInput(LimitOffsetInput):
     summary="Get collection",
     url_name="collections",
 )
+@conditional("bookmarks")
 def bookmarks(request, filters: CollectionPaginatedInput = Query(...)):
     """
     If `url` is passed, return that specific collection item, otherwise return
@@ -106,8 +113,7 @@ def bookmarks(request, filters: CollectionPaginatedInput = Query(...)):
         response = {"bookmarked": bookmark, "csrfmiddlewaretoken": get_token(request)}
         if not profile.is_subscriber:
             response["subscription_limit_reached"] = (
-                user.bookmark_set.filter(deleted=None).count()
-                >= MAX_NON_SUBSCRIBED["collection"]
+                get_bookmark_count(user.id) >= MAX_NON_SUBSCRIBED["collection"]
             )
 
         return response
@@ -119,17 +125,6 @@ def bookmarks(request, filters: CollectionPaginatedInput = Query(...)):
         .order_by("-created")
     )
 
-    if filters.sort == "title" or filters.terms:
-        qs = qs.annotate(
-            display_title=Case(
-                When(
-                    custom_name="",
-                    then=Cast("documenturl__metadata__title", CharField()),
-                ),
-                default=F("custom_name"),
-            )
-        )
-
     if filters.sort == "title":
         qs = qs.order_by("display_title")
 
@@ -146,8 +141,7 @@ def bookmarks(request, filters: CollectionPaginatedInput = Query(...)):
         response["items"].append(item)
     if not profile.is_subscriber:
         response["subscription_limit_reached"] = (
-            user.bookmark_set.filter(deleted=None).count()
-            >= MAX_NON_SUBSCRIBED["collection"]
+            get_bookmark_count(user.id) >= MAX_NON_SUBSCRIBED["collection"]
         )
     return response
 
@@ -164,44 +158,32 @@ def save_or_delete_bookmark(
     name: str = Form(None),
     notes: str = Form(None),
 ):
-    absolute_url = f"{settings.BOOKMARKS_BASE_URL}{url}/index.json"
-    try:
-        documenturl = DocumentURL.objects.get(uri=DocumentURL.normalize_uri(url))
-        assert not documenturl.invalid
-    except DocumentURL.DoesNotExist:
-        response = download_url(absolute_url)
-        # Because it's so big, only store certain fields that are used.
-        full_metadata = response.json()["doc"]
-        metadata = {}
-        # Should we so day realize that we want to and need to store more
-        # about the remote Yari documents, we'd simply invoke some background
-        # processing job that forces a refresh.
-        for key in ("title", "mdn_url", "parents"):
-            if key in full_metadata:
-                metadata[key] = full_metadata[key]
-
-        documenturl = DocumentURL.objects.create(
-            uri=DocumentURL.normalize_uri(url),
-            absolute_url=absolute_url,
-            metadata=metadata,
-        )
+    documenturl = get_or_create_documenturl(url)
+    assert not documenturl.invalid
 
     bookmark: Optional[Bookmark] = request.user.bookmark_set.filter(
         documenturl=documenturl
     ).first()
+    if bookmark:
+        bookmark.documenturl = documenturl
 
     profile: UserProfile = request.auth
 
-    bookmark_count = request.user.bookmark_set.filter(deleted=None).count()
+    bookmark_count = get_bookmark_count(request.user.id)
     subscription_limit_reached = False
     if delete:
-        if bookmark and not bookmark.deleted:
-            bookmark.deleted = timezone.now()
-            bookmark.save()
+        now = timezone.now()
+        # Only count it once when deleted by concurrent requests.
+        if bookmark and Bookmark.objects.filter(pk=bookmark.pk, deleted=None).update(
+            deleted=now, modified=now
+        ):
+            bump_versions("bookmarks", [request.user.id])
+            bookmark_count = adjust_bookmark_count(request.user.id, -1)
             # Having deleted it's unlikely that the limit will still be reached but check anyway.
-            subscription_limit_reached = (bookmark_count - 1) >= MAX_NON_SUBSCRIBED[
-                "collection"
-            ] and not profile.is_subscriber
+            subscription_limit_reached = (
+                bookmark_count >= MAX_NON_SUBSCRIBED["collection"]
+                and not profile.is_subscriber
+            )
         return 200, {
             "subscription_limit_reached": subscription_limit_reached,
             "ok": True,
@@ -216,14 +198,17 @@ def save_or_delete_bookmark(
         if notes is not None:
             bookmark.notes = notes[:500]
         bookmark.save()
+        bump_versions("bookmarks", [request.user.id])
         return 201, {
             "subscription_limit_reached": subscription_limit_reached
             and not profile.is_subscriber,
             "ok": True,
         }
 
-    # Create or undelete. Check limits.
-    if not profile.is_subscriber and subscription_limit_reached:
+    # Create or undelete. Check limits, reserving the new bookmark right away.
+    bookmark_count = reserve_bookmark_count(request.user.id, 1)
+    if not profile.is_subscriber and bookmark_count > MAX_NON_SUBSCRIBED["collection"]:
+        adjust_bookmark_count(request.user.id, -1)
         return 400, {
             "error": "max_subscriptions",
             "info": {"max_allowed": MAX_NON_SUBSCRIBED["collection"]},
@@ -234,16 +219,20 @@ def save_or_delete_bookmark(
         bookmark.deleted = None
     else:
         # Otherwise, create a brand new entry
-        bookmark = request.user.bookmark_set.create(documenturl=documenturl)
+        bookmark = Bookmark(user=request.user, documenturl=documenturl)
 
     if name is not None:
         bookmark.custom_name = name[:500]
     if notes is not None:
         bookmark.notes = notes[:500]
 
-    bookmark.save()
+    try:
+        bookmark.save()
+    except Exception:
+        adjust_bookmark_count(request.user.id, -1)
+        raise
+    bump_versions("bookmarks", [request.user.id])
     subscription_limit_reached = (
-        bookmark_count + 1 >= MAX_NON_SUBSCRIBED["collection"]
-        and not profile.is_subscriber
+        bookmark_count >= MAX_NON_SUBSCRIBED["collection"] and not profile.is_subscriber
     )
     return 201, {"subscription_limit_reached": subscription_limit_reached, "ok": True}
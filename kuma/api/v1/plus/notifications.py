@@ -2,17 +2,21 @@ from __future__ import annotations
 
 import datetime
 import json
+import re
 from typing import Optional
 
 # import requests
 import requests
 from django.conf import settings
-from django.db.models import Q
+from django.contrib.postgres.search import SearchQuery
+from django.db import transaction
+from django.db.models import F
 from django.middleware.csrf import get_token
 from ninja import Field, Router
 from ninja.pagination import paginate
 from sentry_sdk import capture_exception
 
+from kuma.core.utils import bump_versions
 from kuma.documenturls.models import DocumentURL
 from kuma.notifications.models import (
     DefaultWatch,
@@ -21,17 +25,29 @@ from kuma.notifications.models import (
     UserWatch,
     Watch,
 )
-from kuma.notifications.utils import process_changes
+from kuma.notifications.utils import (
+    adjust_unread_count,
+    adjust_watch_count,
+    get_unread_count,
+    get_watch_count,
+    process_changes,
+    publish_notifications,
+    reserve_watch_count,
+    set_unread_count,
+)
 from kuma.settings.common import MAX_NON_SUBSCRIBED
 from kuma.users.models import UserProfile
 
+from ..etags import conditional
 from ..pagination import LimitOffsetPaginatedResponse, LimitOffsetPaginationWithMeta
 from ..smarter_schema import Schema
 
 admin_router = Router(tags=["admin"])
 notifications_router = Router(tags=["notifications"])
 watch_router = Router(tags=["watch"])
-limit_offset_paginate_with_meta = paginate(LimitOffsetPaginationWithMeta)
+notifications_paginate = paginate(
+    LimitOffsetPaginationWithMeta, keyset=("-created", "id")
+)
 
 
 class Ok(Schema):
@@ -49,6 +65,10 @@ class NotOk(Schema):
     info: dict = None
 
 
+class UnreadCount(Schema):
+    count: int
+
+
 class NotificationSchema(Schema):
     id: int
     title: str = Field(..., alias="notification.title")
@@ -65,7 +85,8 @@ class NotificationSchema(Schema):
     response=LimitOffsetPaginatedResponse[NotificationSchema],
     url_name="plus.notifications",
 )
-@limit_offset_paginate_with_meta
+@conditional("notifications")
+@notifications_paginate
 def notifications(
     request,
     starred: bool = None,
@@ -75,7 +96,9 @@ def notifications(
     sort: str = None,
     **kwargs,
 ):
-    qs = request.user.notification_set.select_related("notification")
+    qs = request.user.notification_set.filter(deleted=False).select_related(
+        "notification"
+    )
     if starred is not None:
         qs = qs.filter(starred=starred)
 
@@ -86,29 +109,49 @@ def notifications(
         qs = qs.filter(notification__type=filterType)
 
     if q:
-        qs = qs.filter(
-            Q(notification__title__icontains=q) | Q(notification__text__icontains=q)
-        )
+        # Match every word as a prefix, so partially typed words still match.
+        if terms := re.findall(r"\w+", q):
+            query = SearchQuery(
+                " & ".join(f"{term}:*" for term in terms),
+                config="english",
+                search_type="raw",
+            )
+            qs = qs.filter(notification__search_vector=query)
+        else:
+            qs = qs.none()
 
     if sort == "title":
         order_by = "notification__title"
     else:
-        order_by = "-notification__created"
-    qs = qs.order_by(order_by, "id")
+        order_by = "-created"
+    return qs.order_by(order_by, "id")
+
 
-    qs = qs.filter(deleted=False)
-    return qs
+@notifications_router.get(
+    "/unread-count/", response=UnreadCount, url_name="plus.notifications.unread_count"
+)
+def unread_count(request):
+    return {"count": get_unread_count(request.user.id)}
 
 
 @notifications_router.post("/all/mark-as-read/", response=Ok)
 def mark_all_as_read(request):
     request.user.notification_set.filter(read=False).update(read=True)
+    set_unread_count(request.user.id, 0)
+    bump_versions("notifications", [request.user.id])
     return True
 
 
 @notifications_router.post("/{int:pk}/mark-as-read/", response=Ok)
 def mark_as_read(request, pk: int):
-    request.user.notification_set.filter(pk=pk, read=False).update(read=True)
+    notifications = request.user.notification_set.filter(pk=pk, read=False)
+    # Deleted notifications can be marked as read too, but they aren't part of
+    # the unread count.
+    unread = notifications.filter(deleted=False).update(read=True)
+    updated = unread + notifications.update(read=True)
+    adjust_unread_count(request.user.id, -unread)
+    if updated:
+        bump_versions("notifications", [request.user.id])
     return True
 
 
@@ -120,6 +163,7 @@ def toggle_starred(request, pk: int):
         return 400, "no matching notification"
     notification.starred = not notification.starred
     notification.save()
+    bump_versions("notifications", [request.user.id])
     return 200, True
 
 
@@ -134,6 +178,7 @@ def star_many(request, data: StarMany):
     request.user.notification_set.filter(deleted=False).filter(pk__in=data.ids).update(
         starred=True
     )
+    bump_versions("notifications", [request.user.id])
     return 200, True
 
 
@@ -144,6 +189,7 @@ def unstar_many(request, data: StarMany):
     request.user.notification_set.filter(deleted=False).filter(pk__in=data.ids).update(
         starred=False
     )
+    bump_versions("notifications", [request.user.id])
     return 200, True
 
 
@@ -151,16 +197,28 @@ def unstar_many(request, data: StarMany):
     "/{int:pk}/delete/", response=Ok, url_name="notifications_delete_id"
 )
 def delete_notification(request, pk: int):
-    request.user.notification_set.filter(id=pk).update(deleted=True)
+    set_deleted(request.user, [pk], True)
     return True
 
 
 @notifications_router.post("/{int:pk}/undo-deletion/", response=Ok)
 def undo_deletion(request, pk: int):
-    request.user.notification_set.filter(id=pk).update(deleted=False)
+    set_deleted(request.user, [pk], False)
     return True
 
 
+def set_deleted(user, ids: list[int], deleted: bool):
+    """
+    Flip ``deleted`` on the user's notifications, keeping the unread counter
+    in step with the unread ones that were hidden or restored.
+    """
+    qs = user.notification_set.filter(pk__in=ids, deleted=not deleted)
+    unread = qs.filter(read=False).update(deleted=deleted)
+    if qs.update(deleted=deleted) or unread:
+        bump_versions("notifications", [user.id])
+    adjust_unread_count(user.id, -unread if deleted else unread)
+
+
 class DeleteMany(Schema):
     ids: list[int]
 
@@ -169,9 +227,7 @@ class DeleteMany(Schema):
     "/delete-ids/", response={200: Ok, 400: NotOk}, url_name="notifications_delete_many"
 )
 def delete_notifications(request, data: DeleteMany):
-    request.user.notification_set.filter(deleted=False).filter(pk__in=data.ids).update(
-        deleted=True
-    )
+    set_deleted(request.user, data.ids, True)
     return 200, True
 
 
@@ -181,47 +237,65 @@ class WatchSchema(Schema):
     path: str
 
 
+def serialize_custom(values: dict) -> dict:
+    return {
+        "content": values["content_updates"],
+        "compatibility": values["browser_compatibility"],
+    }
+
+
 @watch_router.get("/watching/", url_name="watching")
+@conditional("watching")
 def watched(request, q: str = "", url: str = "", limit: int = 20, offset: int = 0):
-    qs = request.user.userwatch_set.select_related("watch", "user__defaultwatch")
     profile: UserProfile = request.auth
-
+    qs = request.user.userwatch_set.values(
+        "custom",
+        "custom_default",
+        "content_updates",
+        "browser_compatibility",
+        title=F("watch__title"),
+        url=F("watch__url"),
+        path=F("watch__path"),
+    )
     hasDefault = None
-    try:
-        hasDefault = request.user.defaultwatch.custom_serialize()
-    except DefaultWatch.DoesNotExist:
-        pass
+    default_watch = (
+        DefaultWatch.objects.filter(user=request.user)
+        .values("content_updates", "browser_compatibility")
+        .first()
+    )
+    if default_watch:
+        hasDefault = serialize_custom(default_watch)
     if url:
         url = DocumentURL.normalize_uri(url)
-        qs = qs.filter(watch__url=url)
+        qs = qs.filter(watch__url_hash=Watch.hash_url(url))
     if q:
         qs = qs.filter(watch__title__icontains=q)
 
-    qs = qs[offset : offset + limit]
+    rows = list(qs[offset : offset + limit])
     response = {}
     results = []
     # Default settings at top level if exist
     if hasDefault:
         response["default"] = hasDefault
     response["csrfmiddlewaretoken"] = get_token(request)
-    for item in qs:
+    for item in rows:
         res = {}
-        res["title"] = item.watch.title
-        res["url"] = item.watch.url
-        res["path"] = item.watch.path
+        res["title"] = item["title"]
+        res["url"] = item["url"]
+        res["path"] = item["path"]
 
         # No custom notifications just major updates.
-        if not item.custom:
+        if not item["custom"]:
             res["status"] = "major"
         else:
             res["status"] = "custom"
             # Subscribed to custom
-            if item.custom_default and hasDefault:
+            if item["custom_default"] and hasDefault:
                 # Subscribed to the defaults
                 res["custom"] = "default"
             else:
                 # Subscribed to fine-grained options
-                res["custom"] = item.custom_serialize()
+                res["custom"] = serialize_custom(item)
         results.append(res)
 
     if url != "" and len(results) == 0:
@@ -232,7 +306,7 @@ def watched(request, q: str = "", url: str = "", limit: int = 20, offset: int =
         response["items"] = results
     if not profile.is_subscriber:
         response["subscription_limit_reached"] = (
-            request.user.userwatch_set.count() >= MAX_NON_SUBSCRIBED["notification"]
+            get_watch_count(request.user.id) >= MAX_NON_SUBSCRIBED["notification"]
         )
     return response
 
@@ -260,19 +334,19 @@ def update_watch(request, url: str, data: UpdateWatch):
     profile: UserProfile = request.auth
     watched: Optional[UserWatch] = (
         request.user.userwatch_set.select_related("watch", "user__defaultwatch")
-        .filter(watch__url=url)
+        .filter(watch__url_hash=Watch.hash_url(url))
         .first()
     )
     user = watched.user if watched else request.user
-    watched_count = request.user.userwatch_set.count()
+    watched_count = get_watch_count(request.user.id)
     subscription_limit_reached = watched_count >= MAX_NON_SUBSCRIBED["notification"]
 
     if data.unwatch:
-        if watched:
-            watched.delete()
-        subscription_limit_reached = (watched_count - 1) >= MAX_NON_SUBSCRIBED[
-            "notification"
-        ]
+        # Only count it once when unwatched by concurrent requests.
+        if watched and watched.delete()[0]:
+            watched_count = adjust_watch_count(request.user.id, -1)
+            bump_versions("watching", [request.user.id])
+        subscription_limit_reached = watched_count >= MAX_NON_SUBSCRIBED["notification"]
         return 200, {
             "subscription_limit_reached": subscription_limit_reached,
             "ok": True,
@@ -303,28 +377,41 @@ def update_watch(request, url: str, data: UpdateWatch):
                 # Always create custom defaults if they are missing.
                 DefaultWatch.objects.update_or_create(user=user, defaults=custom_data)
         watched_data.update(custom_data)
-    if watched:
-        watch: Watch = watched.watch
-        # Update the title / path if they changed.
-        if title != watch.title or path != watch.path:
-            watch.title = title
-            watch.path = path
-            watch.save()
-    else:
-        # Check on creation if allowed.
+    if not watched:
+        # Check on creation if allowed, reserving the new watch right away.
+        watched_count = reserve_watch_count(request.user.id, 1)
         if (
-            watched_count >= MAX_NON_SUBSCRIBED["notification"]
+            watched_count > MAX_NON_SUBSCRIBED["notification"]
             and not profile.is_subscriber
         ):
+            adjust_watch_count(request.user.id, -1)
             return 400, {
                 "error": "max_subscriptions",
                 "info": {"max_allowed": MAX_NON_SUBSCRIBED["notification"]},
             }
-        watch = Watch.objects.get_or_create(url=url, title=title, path=path)[0]
-        subscription_limit_reached = (watched_count + 1) >= MAX_NON_SUBSCRIBED[
-            "notification"
-        ]
-    user.userwatch_set.update_or_create(watch=watch, defaults=watched_data)
+        subscription_limit_reached = watched_count >= MAX_NON_SUBSCRIBED["notification"]
+    try:
+        watch: Watch = (
+            watched.watch
+            if watched
+            else Watch.objects.for_url(url).get_or_create(
+                defaults={"url": url, "title": title, "path": path}
+            )[0]
+        )
+        # Update the title / path if they changed.
+        if title != watch.title or path != watch.path:
+            watch.title = title
+            watch.path = path
+            watch.save(update_fields=["title", "path"])
+            # Which changes the watched pages of everyone watching it.
+            bump_versions("watching", watch.users.values_list("id", flat=True))
+        user.userwatch_set.update_or_create(watch=watch, defaults=watched_data)
+    except Exception:
+        if not watched:
+            # Release the reserved watch.
+            adjust_watch_count(request.user.id, -1)
+        raise
+    bump_versions("watching", [request.user.id])
     return 200, {"subscription_limit_reached": subscription_limit_reached, "ok": True}
 
 
@@ -339,17 +426,176 @@ class UnwatchMany(Schema):
 )
 def unwatch(request, data: UnwatchMany):
 
-    request.user.userwatch_set.select_related("watch", "user__watch").filter(
-        watch__url__in=data.unwatch
-    ).delete()
+    deleted, _ = (
+        request.user.userwatch_set.select_related("watch", "user__watch")
+        .filter(watch__url_hash__in=[Watch.hash_url(url) for url in data.unwatch])
+        .delete()
+    )
+    if deleted:
+        adjust_watch_count(request.user.id, -deleted)
+        bump_versions("watching", [request.user.id])
     profile: UserProfile = request.auth
     if profile.is_subscriber:
         subscription_limit_reached = False
     else:
         subscription_limit_reached = (
-            request.user.userwatch_set.count() >= MAX_NON_SUBSCRIBED["notification"]
+            get_watch_count(request.user.id) >= MAX_NON_SUBSCRIBED["notification"]
+        )
+
+    return 200, {"subscription_limit_reached": subscription_limit_reached, "ok": True}
+
+
+class BulkWatchItem(Schema):
+    url: str
+    unwatch: bool = None
+    title: str = None
+    path: str = None
+
+    custom: UpdateWatchCustom = None
+    custom_default: bool = None
+
+
+class BulkWatch(Schema):
+    items: list[BulkWatchItem]
+
+
+@watch_router.post(
+    "/watching/bulk/",
+    response={200: WatchUpdateResponse, 400: NotOk},
+    url_name="watching_bulk",
+)
+def update_watches(request, data: BulkWatch):
+    """
+    Watch, update or unwatch many pages at once, e.g. when importing a
+    reading list. Either every change is applied or none are.
+    """
+    profile: UserProfile = request.auth
+    items = {DocumentURL.normalize_uri(item.url): item for item in data.items}
+    for url, item in items.items():
+        if not item.unwatch and not item.title:
+            return 400, {"error": "missing title", "info": {"url": url}}
+
+    watched = {
+        user_watch.watch.url: user_watch
+        for user_watch in request.user.userwatch_set.select_related("watch").filter(
+            watch__url_hash__in=[Watch.hash_url(url) for url in items]
         )
+    }
+    unwatched = [
+        watched[url].id
+        for url, item in items.items()
+        if item.unwatch and url in watched
+    ]
+    new_urls = [
+        url for url, item in items.items() if not item.unwatch and url not in watched
+    ]
+    # Reserve room for the new watches up front, see `update_watch`.
+    delta = len(new_urls) - len(unwatched)
+    watched_count = reserve_watch_count(request.user.id, delta)
+    if (
+        new_urls
+        and watched_count > MAX_NON_SUBSCRIBED["notification"]
+        and not profile.is_subscriber
+    ):
+        adjust_watch_count(request.user.id, -delta)
+        return 400, {
+            "error": "max_subscriptions",
+            "info": {"max_allowed": MAX_NON_SUBSCRIBED["notification"]},
+        }
 
+    try:
+        with transaction.atomic():
+            deleted = 0
+            if unwatched:
+                deleted, _ = UserWatch.objects.filter(id__in=unwatched).delete()
+
+            default_item = next(
+                (
+                    item
+                    for item in items.values()
+                    if not item.unwatch and item.custom and item.custom_default
+                ),
+                None,
+            )
+            if default_item:
+                DefaultWatch.objects.get_or_create(
+                    user=request.user,
+                    defaults={
+                        "content_updates": default_item.custom.content,
+                        "browser_compatibility": sorted(
+                            default_item.custom.compatibility
+                        ),
+                    },
+                )
+
+            # Pages nobody watched yet get a Watch, the others are shared.
+            Watch.objects.bulk_create(
+                [
+                    Watch(url=url, title=items[url].title, path=items[url].path or "")
+                    for url in new_urls
+                ],
+                ignore_conflicts=True,
+            )
+            watches = {watch.url: watch for watch in Watch.objects.for_urls(new_urls)}
+
+            changed_watches = []
+            user_watches = []
+            for url, item in items.items():
+                if item.unwatch:
+                    continue
+                if user_watch := watched.get(url):
+                    watch = user_watch.watch
+                    path = item.path or ""
+                    # Update the title / path if they changed.
+                    if item.title != watch.title or path != watch.path:
+                        watch.title = item.title
+                        watch.path = path
+                        changed_watches.append(watch)
+                else:
+                    user_watch = UserWatch(user=request.user, watch=watches[url])
+                user_watch.custom = item.custom is not None
+                if item.custom:
+                    user_watch.custom_default = bool(item.custom_default)
+                    user_watch.content_updates = item.custom.content
+                    user_watch.browser_compatibility = sorted(item.custom.compatibility)
+                user_watches.append(user_watch)
+
+            Watch.objects.bulk_update(changed_watches, ["title", "path"])
+            UserWatch.objects.bulk_update(
+                [user_watch for user_watch in user_watches if user_watch.pk],
+                [
+                    "custom",
+                    "custom_default",
+                    "content_updates",
+                    "browser_compatibility",
+                ],
+            )
+            UserWatch.objects.bulk_create(
+                [user_watch for user_watch in user_watches if not user_watch.pk]
+            )
+    except Exception:
+        # Release the reserved watches.
+        adjust_watch_count(request.user.id, -delta)
+        raise
+    if deleted < len(unwatched):
+        # Some were unwatched by a concurrent request, which counted them.
+        watched_count = adjust_watch_count(request.user.id, len(unwatched) - deleted)
+
+    # Renamed pages change the watched pages of everyone watching them.
+    bump_versions(
+        "watching",
+        {request.user.id}
+        | set(
+            UserWatch.objects.filter(watch__in=changed_watches).values_list(
+                "user_id", flat=True
+            )
+        ),
+    )
+
+    subscription_limit_reached = (
+        watched_count >= MAX_NON_SUBSCRIBED["notification"]
+        and not profile.is_subscriber
+    )
     return 200, {"subscription_limit_reached": subscription_limit_reached, "ok": True}
 
 
@@ -362,17 +608,15 @@ class CreateNotificationSchema(Schema):
 @admin_router.post("/create/", response={200: Ok, 400: NotOk})
 def create(request, body: CreateNotificationSchema):
     url = DocumentURL.normalize_uri(body.raw_url)
-    watchers = Watch.objects.filter(url=url)
-    if not watchers:
+    watcher = Watch.objects.for_url(url).first()
+    if not watcher:
         return 400, {"error": "No watchers found"}
-    notification_data, _ = NotificationData.objects.get_or_create(
+    notification_data = NotificationData(
         text=body.text, title=body.title, type="content"
     )
-
-    for watcher in watchers:
-        # considering the possibility of multiple pages existing for the same path
-        for user in watcher.users.all():
-            Notification.objects.create(notification=notification_data, user=user)
+    publish_notifications(
+        [(notification_data, watcher.users.values_list("id", flat=True))]
+    )
 
     return True
 
@@ -381,7 +625,9 @@ class UpdateNotificationSchema(Schema):
     filename: str
 
 
-@admin_router.post("/update/", response={200: Ok, 400: NotOk, 401: NotOk})
+@admin_router.post(
+    "/update/", response={200: Ok, 400: NotOk, 401: NotOk}, url_name="admin.update"
+)
 def update(request, body: UpdateNotificationSchema):
     try:
         changes = json.loads(
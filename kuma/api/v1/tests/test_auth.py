@@ -0,0 +1,76 @@
+import time
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from kuma.api.v1.auth import is_subscriber
+from kuma.users.tasks import delete_user, schedule_user_deletion
+
+
+def bearer_request():
+    request = RequestFactory().get("/", HTTP_AUTHORIZATION="Bearer some.jwt.token")
+    request.user = AnonymousUser()
+    return request
+
+
+@pytest.mark.django_db
+def test_bearer_token_is_verified_once(settings, django_assert_num_queries):
+    payload = {
+        "sub": "fxa-uid",
+        "email": "fxa@example.com",
+        "subscriptions": [settings.MDN_PLUS_SUBSCRIPTION],
+        "exp": time.time() + 60,
+    }
+    with mock.patch(
+        "kuma.api.v1.auth.is_authorized_request", return_value=payload
+    ) as is_authorized_request:
+        request = bearer_request()
+        assert is_subscriber(request)
+        assert request.user.username == "fxa-uid"
+        assert request.user.userprofile.is_subscriber
+
+        # Only reading the user, to tell whether it's still active.
+        request = bearer_request()
+        with django_assert_num_queries(1):
+            assert is_subscriber(request)
+        assert request.user.username == "fxa-uid"
+
+    assert is_authorized_request.call_count == 1
+
+
+@pytest.mark.django_db
+def test_invalid_bearer_token_is_not_cached():
+    with mock.patch(
+        "kuma.api.v1.auth.is_authorized_request",
+        return_value={"error": "token expired"},
+    ) as is_authorized_request:
+        assert not is_subscriber(bearer_request())
+        assert not is_subscriber(bearer_request())
+
+    assert is_authorized_request.call_count == 2
+
+
+@pytest.mark.django_db
+def test_bearer_token_of_deleted_user(django_user_model):
+    payload = {"sub": "fxa-uid", "email": "fxa@example.com", "exp": time.time() + 60}
+    with mock.patch("kuma.api.v1.auth.is_authorized_request", return_value=payload):
+        request = bearer_request()
+        assert is_subscriber(request)
+        django_user_model.objects.filter(id=request.user.id).delete()
+        assert not is_subscriber(bearer_request())
+
+
+@pytest.mark.django_db
+def test_bearer_token_of_user_pending_deletion():
+    payload = {"sub": "fxa-uid", "email": "fxa@example.com", "exp": time.time() + 60}
+    with mock.patch("kuma.api.v1.auth.is_authorized_request", return_value=payload):
+        request = bearer_request()
+        assert is_subscriber(request)
+
+        with mock.patch.object(delete_user, "delay"):
+            schedule_user_deletion(request.user)
+        assert not is_subscriber(bearer_request())
+        # Verifying the token again doesn't enable them either.
+        assert not is_subscriber(bearer_request())
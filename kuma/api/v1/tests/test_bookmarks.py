@@ -1,9 +1,18 @@
 import copy
+from unittest import mock
 from urllib.parse import urlencode
 
 import pytest
+from django.core.cache import cache
+from django.utils import timezone
 
+from kuma.bookmarks.models import Bookmark
+from kuma.bookmarks.utils import adjust_bookmark_count, get_bookmark_count
 from kuma.core.urlresolvers import reverse
+from kuma.documenturls.tasks import (
+    preload_documenturl_metadata,
+    refresh_documenturl_metadata,
+)
 from kuma.users.models import UserProfile
 
 
@@ -337,3 +346,182 @@ def test_undo_bookmark(subscriber_client, mock_requests, settings):
         "/en-US/docs/Bar",
         "/en-US/docs/Foo",
     ]
+
+
+@pytest.mark.django_db
+def test_bookmarks_subscription_limit(user_client, mock_requests, settings):
+    url = reverse("api-v1:collections")
+    get_urls = []
+    for i in range(settings.MAX_NON_SUBSCRIBED["collection"] + 1):
+        mock_requests.register_uri(
+            "GET",
+            settings.BOOKMARKS_BASE_URL + f"/en-US/docs/{i}/index.json",
+            json={"doc": {"title": f"Doc {i}", "mdn_url": f"/en-US/docs/{i}"}},
+        )
+        get_urls.append(f'{url}?{urlencode({"url": f"/en-US/docs/{i}"})}')
+
+    *allowed, over_limit = get_urls
+    for get_url in allowed:
+        response = user_client.post(get_url)
+        assert response.status_code == 201
+    assert response.json()["subscription_limit_reached"]
+
+    response = user_client.post(over_limit)
+    assert response.status_code == 400
+    assert response.json()["error"] == "max_subscriptions"
+
+    # Deleting a bookmark makes room for another one.
+    response = user_client.post(allowed[0], {"delete": True})
+    assert response.status_code == 200
+    assert not response.json()["subscription_limit_reached"]
+    response = user_client.get(url)
+    assert len(response.json()["items"]) == len(allowed) - 1
+    assert not response.json()["subscription_limit_reached"]
+
+    response = user_client.post(over_limit)
+    assert response.status_code == 201
+    assert response.json()["subscription_limit_reached"]
+
+
+@pytest.mark.django_db
+def test_bookmark_count_is_kept_right(user_client, wiki_user, mock_requests, settings):
+    url = reverse("api-v1:collections")
+    get_urls = []
+    for name in ("Foo", "Bar"):
+        mock_requests.register_uri(
+            "GET",
+            settings.BOOKMARKS_BASE_URL + f"/en-US/docs/{name}/index.json",
+            json={"doc": {"title": name, "mdn_url": f"/en-US/docs/{name}"}},
+        )
+        get_urls.append(f'{url}?{urlencode({"url": f"/en-US/docs/{name}"})}')
+
+    assert user_client.post(get_urls[0]).status_code == 201
+    # The new bookmark is counted even when the count was evicted.
+    cache.clear()
+    assert user_client.post(get_urls[1]).status_code == 201
+    assert get_bookmark_count(wiki_user.id) == 2
+
+    def delete_concurrently(user_id):
+        # Another request deletes the bookmark after this one loaded it.
+        Bookmark.objects.filter(documenturl__uri="/en-us/docs/foo").update(
+            deleted=timezone.now()
+        )
+        adjust_bookmark_count(user_id, -1)
+        return get_bookmark_count(user_id)
+
+    with mock.patch(
+        "kuma.api.v1.plus.bookmarks.get_bookmark_count",
+        side_effect=delete_concurrently,
+    ):
+        response = user_client.post(get_urls[0], {"delete": True})
+    assert response.status_code == 200
+    assert get_bookmark_count(wiki_user.id) == 1
+
+    # Failing to save it releases the room reserved for the bookmark.
+    with mock.patch.object(Bookmark, "save", side_effect=RuntimeError):
+        with pytest.raises(RuntimeError):
+            user_client.post(get_urls[0])
+    assert get_bookmark_count(wiki_user.id) == 1
+
+
+@pytest.mark.django_db
+def test_bookmark_does_not_wait_for_metadata(
+    subscriber_client, mock_requests, settings, django_capture_on_commit_callbacks
+):
+    mock_requests.register_uri(
+        "GET",
+        settings.BOOKMARKS_BASE_URL + "/en-US/search-index.json",
+        json=[{"title": "The Fetch API", "url": "/en-US/docs/Web/API/Fetch_API"}],
+    )
+    preload_documenturl_metadata()
+
+    url = reverse("api-v1:collections")
+    with mock.patch.object(
+        refresh_documenturl_metadata, "delay"
+    ) as delay, django_capture_on_commit_callbacks(execute=True):
+        for doc_url in ("/en-US/docs/Web/API/Fetch_API", "/en-US/docs/Web/API/URL"):
+            response = subscriber_client.post(f'{url}?{urlencode({"url": doc_url})}')
+            assert response.status_code == 201
+        # The new URLs aren't refreshed before they are committed.
+        delay.assert_not_called()
+    assert delay.call_args_list == [
+        mock.call("/en-us/docs/web/api/fetch_api"),
+        mock.call("/en-us/docs/web/api/url"),
+    ]
+
+    response = subscriber_client.get(url, {"sort": "title"})
+    assert [item["title"] for item in response.json()["items"]] == [
+        "The Fetch API",
+        "URL",
+    ]
+
+
+@pytest.mark.django_db
+def test_bookmarks_etag(subscriber_client, mock_requests, settings):
+    doc_url = "/en-US/docs/Web"
+    absolute_url = settings.BOOKMARKS_BASE_URL + doc_url + "/index.json"
+    mock_requests.get(absolute_url, json={"doc": {"title": "Web", "mdn_url": doc_url}})
+    url = reverse("api-v1:collections")
+
+    # The first response sets the CSRF cookie, which is part of the ETag.
+    subscriber_client.get(url)
+    response = subscriber_client.get(url)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    assert subscriber_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    subscriber_client.post(f'{url}?{urlencode({"url": doc_url})}')
+    response = subscriber_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["title"] == "Web"
+    etag = response["ETag"]
+
+    # The title of the document changes for everyone who bookmarked it.
+    mock_requests.get(
+        absolute_url, json={"doc": {"title": "Web technology", "mdn_url": doc_url}}
+    )
+    refresh_documenturl_metadata("/en-us/docs/web")
+    response = subscriber_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["title"] == "Web technology"
+
+
+@pytest.mark.django_db
+def test_bookmarks_search_and_sort(subscriber_client, mock_requests, settings):
+    url = reverse("api-v1:collections")
+    docs = {
+        "/en-US/docs/Web/API/Fetch_API": ("Fetch API", {}),
+        "/en-US/docs/Web/CSS": ("CSS", {"name": "Cascading Style Sheets"}),
+        "/en-US/docs/Web/HTML": ("HTML", {"notes": "Learn the markup"}),
+    }
+    for doc_url, (title, data) in docs.items():
+        absolute_url = settings.BOOKMARKS_BASE_URL + doc_url + "/index.json"
+        mock_requests.get(
+            absolute_url, json={"doc": {"title": title, "mdn_url": doc_url}}
+        )
+        response = subscriber_client.post(f'{url}?{urlencode({"url": doc_url})}', data)
+        assert response.status_code == 201
+
+    def titles(**params):
+        response = subscriber_client.get(url, params)
+        assert response.status_code == 200
+        return [item["title"] for item in response.json()["items"]]
+
+    assert titles(sort="title") == ["Cascading Style Sheets", "Fetch API", "HTML"]
+    assert titles(q="fetch") == ["Fetch API"]
+    assert titles(q="style") == ["Cascading Style Sheets"]
+    assert titles(q="MARKUP") == ["HTML"]
+
+    # The display title follows the title of the document.
+    mock_requests.get(
+        settings.BOOKMARKS_BASE_URL + "/en-US/docs/Web/API/Fetch_API/index.json",
+        json={
+            "doc": {
+                "title": "The Fetch API",
+                "mdn_url": "/en-US/docs/Web/API/Fetch_API",
+            }
+        },
+    )
+    refresh_documenturl_metadata("/en-us/docs/web/api/fetch_api")
+    assert titles(q="the fetch") == ["The Fetch API"]
+    assert titles(sort="title") == ["Cascading Style Sheets", "HTML", "The Fetch API"]
@@ -1,10 +1,13 @@
+import base64
 import json
 
 from django.core.serializers.json import DjangoJSONEncoder
 from django.urls import reverse
+from django.utils import timezone
 from model_bakery import baker
 
 from kuma.notifications import models
+from kuma.notifications.utils import publish_content_notification
 
 
 def test_notifications_anonymous(client):
@@ -197,3 +200,182 @@ def test_unstar_many(user_client, wiki_user):
 
     for i in range(15):
         assert not items_json[i]["starred"]
+
+
+def test_notifications_cursor_pagination(user_client, wiki_user):
+    url = reverse("api-v1:plus.notifications")
+    for i in range(15):
+        baker.make(models.Notification, user=wiki_user, id=i)
+
+    response = user_client.get(url, {"limit": 10})
+    assert response.status_code == 200
+    data = json.loads(response.content)
+    assert [item["id"] for item in data["items"]] == list(range(14, 4, -1))
+    assert data["next_cursor"]
+
+    response = user_client.get(url, {"limit": 10, "cursor": data["next_cursor"]})
+    assert response.status_code == 200
+    data = json.loads(response.content)
+    assert [item["id"] for item in data["items"]] == list(range(4, -1, -1))
+    # A partial page is the last one.
+    assert data["next_cursor"] is None
+
+
+def test_notifications_cursor_pagination_ties(user_client, wiki_user):
+    url = reverse("api-v1:plus.notifications")
+    # Published together, down to the microsecond.
+    data = baker.make(
+        models.NotificationData, created=timezone.now().replace(microsecond=123456)
+    )
+    for i in range(4):
+        baker.make(models.Notification, user=wiki_user, id=i, notification=data)
+
+    response = user_client.get(url, {"limit": 2})
+    data = json.loads(response.content)
+    assert [item["id"] for item in data["items"]] == [0, 1]
+
+    response = user_client.get(url, {"limit": 2, "cursor": data["next_cursor"]})
+    data = json.loads(response.content)
+    assert [item["id"] for item in data["items"]] == [2, 3]
+
+
+def test_notifications_invalid_cursor(user_client, wiki_user):
+    url = reverse("api-v1:plus.notifications")
+    baker.make(models.Notification, user=wiki_user)
+    bad_values = base64.urlsafe_b64encode(b'["not a date", 1]').decode()
+    for cursor in ("not base64!", "bm90IGpzb24=", bad_values):
+        response = user_client.get(url, {"limit": 2, "cursor": cursor})
+        assert response.status_code == 400
+
+
+def test_notifications_cursor_ignored_for_title_sort(user_client, wiki_user):
+    url = reverse("api-v1:plus.notifications")
+    for i in range(3):
+        baker.make(models.Notification, user=wiki_user, id=i)
+
+    response = user_client.get(url, {"limit": 2, "sort": "title"})
+    assert response.status_code == 200
+    data = json.loads(response.content)
+    assert len(data["items"]) == 2
+    assert data["next_cursor"] is None
+
+
+def test_unread_count(user_client, wiki_user):
+    url = reverse("api-v1:plus.notifications.unread_count")
+    notifications_url = reverse("api-v1:plus.notifications")
+    ids = [baker.make(models.Notification, user=wiki_user).pk for i in range(5)]
+    read = baker.make(models.Notification, user=wiki_user, read=True)
+
+    response = user_client.get(url)
+    assert response.status_code == 200
+    assert json.loads(response.content) == {"count": 5}
+
+    user_client.post(reverse("api-v1:notifications_delete_id", kwargs={"pk": ids[0]}))
+    user_client.post(
+        reverse("api-v1:notifications_delete_many"),
+        json.dumps({"ids": [ids[1], read.pk]}),
+        content_type="application/json",
+    )
+    assert json.loads(user_client.get(url).content) == {"count": 3}
+
+    user_client.post(f"{notifications_url}{ids[0]}/undo-deletion/")
+    user_client.post(f"{notifications_url}{ids[2]}/mark-as-read/")
+    assert json.loads(user_client.get(url).content) == {"count": 3}
+
+    user_client.post(f"{notifications_url}all/mark-as-read/")
+    assert json.loads(user_client.get(url).content) == {"count": 0}
+
+    # Publishing keeps the counter in step.
+    watch = baker.make(
+        models.Watch, users=[wiki_user], title="Web", url="/en-us/docs/web"
+    )
+    publish_content_notification(watch.url, "Page updated")
+    assert json.loads(user_client.get(url).content) == {"count": 1}
+
+
+def test_mark_deleted_notification_as_read(user_client, wiki_user):
+    url = reverse("api-v1:plus.notifications.unread_count")
+    notifications_url = reverse("api-v1:plus.notifications")
+    baker.make(models.Notification, user=wiki_user)
+    deleted = baker.make(models.Notification, user=wiki_user, deleted=True)
+    assert json.loads(user_client.get(url).content) == {"count": 1}
+
+    response = user_client.post(f"{notifications_url}{deleted.pk}/mark-as-read/")
+    assert response.status_code == 200
+    deleted.refresh_from_db()
+    assert deleted.read
+    # It wasn't part of the unread count, so the count doesn't change.
+    assert json.loads(user_client.get(url).content) == {"count": 1}
+
+    user_client.post(f"{notifications_url}{deleted.pk}/undo-deletion/")
+    assert json.loads(user_client.get(url).content) == {"count": 1}
+
+
+def test_notifications_search(user_client, wiki_user):
+    url = reverse("api-v1:plus.notifications")
+    match = baker.make(
+        models.Notification,
+        user=wiki_user,
+        notification__title="dialog",
+        notification__text="Supported in Firefox 98",
+    )
+    baker.make(
+        models.Notification,
+        user=wiki_user,
+        notification__title="fetch",
+        notification__text="Removed from Chrome 100",
+    )
+
+    for q in ("firefox", "Fire", "supported firefox", "DIALOG"):
+        response = user_client.get(url, {"q": q})
+        assert response.status_code == 200
+        assert [item["id"] for item in json.loads(response.content)["items"]] == [
+            match.pk
+        ], q
+
+    response = user_client.get(url, {"q": "safari"})
+    assert json.loads(response.content)["items"] == []
+
+    response = user_client.get(url, {"q": "!!"})
+    assert response.status_code == 200
+    assert json.loads(response.content)["items"] == []
+
+
+def test_notifications_etag(user_client, wiki_user, django_assert_max_num_queries):
+    url = reverse("api-v1:plus.notifications")
+    notification = baker.make(models.Notification, user=wiki_user)
+
+    # The first response sets the CSRF cookie, which is part of the ETag.
+    user_client.get(url)
+    response = user_client.get(url)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    assert etag.startswith('W/"')
+    assert "no-store" not in response["Cache-Control"]
+
+    # Nothing changed, so the notifications aren't even queried.
+    with django_assert_max_num_queries(3):
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    assert not response.content
+
+    # Other pages have their own ETag.
+    response = user_client.get(url, {"limit": 1}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+    user_client.post(f"{url}{notification.pk}/toggle-starred/")
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert json.loads(response.content)["items"][0]["starred"]
+    etag = response["ETag"]
+
+    # So do new notifications.
+    watch = baker.make(
+        models.Watch, users=[wiki_user], title="Web", url="/en-us/docs/web"
+    )
+    publish_content_notification(watch.url, "Page updated")
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(json.loads(response.content)["items"]) == 2
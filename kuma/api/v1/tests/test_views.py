@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 
 from kuma.core.tests import assert_no_cache_header
 from kuma.core.urlresolvers import reverse
+from kuma.users.models import UserProfile
 
 
 @pytest.mark.parametrize("http_method", ["put", "post", "delete", "options", "head"])
@@ -80,9 +81,12 @@ def test_account_settings_auth(client):
     assert response.status_code == 401
 
 
-def test_account_settings_delete(user_client, wiki_user):
+def test_account_settings_delete(
+    user_client, wiki_user, django_capture_on_commit_callbacks
+):
     username = wiki_user.username
-    response = user_client.delete(reverse("api-v1:settings"))
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.delete(reverse("api-v1:settings"))
     assert response.status_code == 200
     assert not User.objects.filter(username=username).exists()
 
@@ -118,3 +122,21 @@ def test_set_settings_validation_errors(user_client):
     assert response.status_code == 400
     assert response.json()["errors"]["locale"][0]["code"] == "invalid_choice"
     assert response.json()["errors"]["locale"][0]["message"]
+
+
+def test_whoami_caches_profile(user_client, wiki_user, django_assert_num_queries):
+    profile = UserProfile.objects.create(user=wiki_user, avatar="https://a.example")
+    url = reverse("api-v1:whoami")
+    assert user_client.get(url).json()["avatar_url"] == "https://a.example"
+
+    # Only the user is read, the session comes from the cache too.
+    with django_assert_num_queries(1):
+        response = user_client.get(url)
+    assert response.json()["avatar_url"] == "https://a.example"
+
+    profile.is_subscriber = True
+    profile.subscription_type = UserProfile.SubscriptionType.MDN_PLUS_5M
+    profile.save()
+    data = user_client.get(url).json()
+    assert data["is_subscriber"]
+    assert data["subscription_type"] == "mdn_plus_5m"
@@ -1,9 +1,13 @@
 import json
+from unittest import mock
 
+import pytest
 from django.urls import reverse
 from model_bakery import baker
 
 from kuma.notifications import models
+from kuma.notifications.utils import get_watch_count
+from kuma.settings.common import MAX_NON_SUBSCRIBED
 
 
 def test_unwatch_manys(user_client, wiki_user):
@@ -48,3 +52,194 @@ def test_unwatch_manys(user_client, wiki_user):
     )
     # Assert deleted no longer there :)
     assert len(list(filtered)) == 0
+
+
+def test_watched_items(user_client, wiki_user, django_assert_num_queries):
+    url = reverse("api-v1:watching")
+    baker.make(
+        models.DefaultWatch,
+        user=wiki_user,
+        content_updates=False,
+        browser_compatibility=["firefox"],
+    )
+    for i, (custom, custom_default) in enumerate(
+        ((False, False), (True, True), (True, False))
+    ):
+        baker.make(
+            models.UserWatch,
+            user=wiki_user,
+            watch=baker.make(
+                models.Watch, title=f"Page {i}", url=f"/en-us/docs/{i}", path=f"p{i}"
+            ),
+            custom=custom,
+            custom_default=custom_default,
+            content_updates=True,
+            browser_compatibility=["chrome"],
+        )
+
+    # User, profile, default watch, the page of watches and the number of
+    # watches, which is cached from then on. The session is in the cache.
+    with django_assert_num_queries(5):
+        response = user_client.get(url)
+    with django_assert_num_queries(4):
+        response = user_client.get(url)
+    assert response.status_code == 200
+    data = json.loads(response.content)
+    assert data["default"] == {"content": False, "compatibility": ["firefox"]}
+    assert data["subscription_limit_reached"] is True
+    assert sorted(data["items"], key=lambda item: item["title"]) == [
+        {"title": "Page 0", "url": "/en-us/docs/0", "path": "p0", "status": "major"},
+        {
+            "title": "Page 1",
+            "url": "/en-us/docs/1",
+            "path": "p1",
+            "status": "custom",
+            "custom": "default",
+        },
+        {
+            "title": "Page 2",
+            "url": "/en-us/docs/2",
+            "path": "p2",
+            "status": "custom",
+            "custom": {"content": True, "compatibility": ["chrome"]},
+        },
+    ]
+
+    # Filtered to a single page, the limit still counts every watch.
+    response = user_client.get(url, {"url": "/en-US/docs/0"})
+    data = json.loads(response.content)
+    assert data["status"] == "major"
+    assert data["url"] == "/en-us/docs/0"
+    assert data["subscription_limit_reached"] is True
+
+    response = user_client.get(url, {"url": "/en-US/docs/unknown"})
+    data = json.loads(response.content)
+    assert data["status"] == "unwatched"
+    assert data["subscription_limit_reached"] is True
+
+
+def test_bulk_watch(subscriber_client, wiki_user):
+    url = reverse("api-v1:watching_bulk")
+    existing = baker.make(
+        models.UserWatch,
+        user=wiki_user,
+        watch=baker.make(models.Watch, title="Old", url="/en-us/docs/a", path=""),
+    )
+    removed = baker.make(
+        models.UserWatch,
+        user=wiki_user,
+        watch=baker.make(models.Watch, title="B", url="/en-us/docs/b", path=""),
+    )
+    shared = baker.make(models.Watch, title="C", url="/en-us/docs/c", path="c")
+
+    response = subscriber_client.post(
+        url,
+        json.dumps(
+            {
+                "items": [
+                    {"url": "/en-US/docs/A", "title": "New", "path": "a"},
+                    {"url": "/en-US/docs/B", "unwatch": True},
+                    {
+                        "url": "/en-US/docs/C",
+                        "title": "C",
+                        "path": "c",
+                        "custom": {"content": False, "compatibility": ["safari"]},
+                        "custom_default": True,
+                    },
+                    {"url": "/en-US/docs/D", "title": "D"},
+                ]
+            }
+        ),
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    assert json.loads(response.content) == {
+        "ok": True,
+        "subscription_limit_reached": False,
+    }
+
+    user_watches = {
+        user_watch.watch.url: user_watch
+        for user_watch in wiki_user.userwatch_set.select_related("watch")
+    }
+    assert set(user_watches) == {"/en-us/docs/a", "/en-us/docs/c", "/en-us/docs/d"}
+    assert not models.UserWatch.objects.filter(pk=removed.pk).exists()
+    assert user_watches["/en-us/docs/a"].pk == existing.pk
+    assert user_watches["/en-us/docs/a"].watch.title == "New"
+    assert user_watches["/en-us/docs/a"].watch.path == "a"
+    assert user_watches["/en-us/docs/c"].watch == shared
+    assert user_watches["/en-us/docs/c"].custom
+    assert user_watches["/en-us/docs/c"].browser_compatibility == ["safari"]
+    assert user_watches["/en-us/docs/d"].watch.title == "D"
+    assert wiki_user.defaultwatch.browser_compatibility == ["safari"]
+
+
+def test_bulk_watch_limit(user_client, wiki_user):
+    url = reverse("api-v1:watching_bulk")
+    items = [
+        {"url": f"/en-US/docs/{i}", "title": str(i)}
+        for i in range(MAX_NON_SUBSCRIBED["notification"] + 1)
+    ]
+    response = user_client.post(
+        url, json.dumps({"items": items}), content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert json.loads(response.content)["error"] == "max_subscriptions"
+    assert not wiki_user.userwatch_set.exists()
+
+    response = user_client.post(
+        url, json.dumps({"items": items[:-1]}), content_type="application/json"
+    )
+    assert response.status_code == 200
+    assert json.loads(response.content)["subscription_limit_reached"]
+    assert wiki_user.userwatch_set.count() == MAX_NON_SUBSCRIBED["notification"]
+
+    response = user_client.post(
+        url,
+        json.dumps({"items": [{"url": "/en-US/docs/x"}]}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    assert json.loads(response.content)["error"] == "missing title"
+
+
+def test_failed_watch_releases_its_reservation(user_client, wiki_user):
+    with mock.patch.object(
+        models.Watch.objects, "for_url", side_effect=RuntimeError
+    ), pytest.raises(RuntimeError):
+        user_client.post(
+            f"{reverse('api-v1:watching')}?url=/en-US/docs/A",
+            json.dumps({"title": "A"}),
+            content_type="application/json",
+        )
+    assert get_watch_count(wiki_user.id) == 0
+
+
+def test_failed_bulk_watch_releases_its_reservation(user_client, wiki_user):
+    url = reverse("api-v1:watching_bulk")
+    items = [{"url": "/en-US/docs/A", "title": "A"}]
+    with mock.patch.object(
+        models.Watch.objects, "bulk_create", side_effect=RuntimeError
+    ), pytest.raises(RuntimeError):
+        user_client.post(
+            url, json.dumps({"items": items}), content_type="application/json"
+        )
+    assert get_watch_count(wiki_user.id) == 0
+
+
+def test_watch_is_shared_by_url(subscriber_client, wiki_user):
+    shared = baker.make(models.Watch, title="Old", url="/en-us/docs/a", path="")
+
+    response = subscriber_client.post(
+        f"{reverse('api-v1:watching')}?url=/en-US/docs/A",
+        json.dumps({"title": "New", "path": "a"}),
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+
+    assert models.Watch.objects.count() == 1
+    assert models.Watch.objects.for_url("/en-us/docs/a").get() == shared
+    user_watch = wiki_user.userwatch_set.select_related("watch").get()
+    assert user_watch.watch == shared
+    assert user_watch.watch.title == "New"
+    assert user_watch.watch.path == "a"
@@ -1,6 +1,7 @@
 from typing import Literal, Optional, Union
 
 from django.conf import settings
+from django.contrib.auth import logout
 from django.middleware.csrf import get_token
 from ninja import Router, Schema
 
@@ -8,6 +9,8 @@ from kuma.api.v1.auth import profile_auth
 from kuma.api.v1.forms import AccountSettingsForm
 from kuma.api.v1.plus.notifications import Ok
 from kuma.users.models import UserProfile
+from kuma.users.tasks import schedule_user_deletion
+from kuma.users.utils import get_profile_data
 
 from .api import api
 
@@ -60,17 +63,17 @@ def whoami(request):
     if user.is_superuser:
         data["is_superuser"] = True
 
-    profile = UserProfile.objects.filter(user=user).first()
-    if profile:
-        data["avatar_url"] = profile.avatar
-        data["is_subscriber"] = profile.is_subscriber
-        data["subscription_type"] = profile.subscription_type
+    if profile := get_profile_data(user.id):
+        data["avatar_url"] = profile["avatar"]
+        data["is_subscriber"] = profile["is_subscriber"]
+        data["subscription_type"] = profile["subscription_type"]
     return data
 
 
 @settings_router.delete("/", url_name="settings")
 def delete_user(request):
-    request.user.delete()
+    schedule_user_deletion(request.user)
+    logout(request)
     return {"deleted": True}
 
 
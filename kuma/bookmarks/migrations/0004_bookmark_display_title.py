@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-19 19:57
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
+
+
+def fill_display_titles(apps, schema_editor):
+    Bookmark = apps.get_model("bookmarks", "Bookmark")
+    DocumentURL = apps.get_model("documenturls", "DocumentURL")
+    document_title = DocumentURL.objects.filter(pk=OuterRef("documenturl")).values(
+        title=KT("metadata__title")
+    )
+    Bookmark.objects.filter(custom_name="").update(
+        display_title=Coalesce(Subquery(document_title), Value(""))
+    )
+    Bookmark.objects.exclude(custom_name="").update(display_title=F("custom_name"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmarks", "0003_auto_20220118_0409"),
+        ("documenturls", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookmark",
+            name="display_title",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.RunPython(
+            code=fill_display_titles, reverse_code=migrations.RunPython.noop
+        ),
+    ]
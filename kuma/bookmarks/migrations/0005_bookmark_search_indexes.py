@@ -0,0 +1,46 @@
+# Generated by Django 5.0.14 on 2026-10-19 19:57
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmarks", "0004_bookmark_display_title"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="bookmark",
+            index=models.Index(
+                condition=models.Q(("deleted__isnull", True)),
+                fields=["user", "display_title"],
+                name="bookmark_user_title_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookmark",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("display_title"),
+                    name="gin_trgm_ops",
+                ),
+                name="bookmark_title_trgm_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookmark",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("notes"), name="gin_trgm_ops"
+                ),
+                name="bookmark_notes_trgm_idx",
+            ),
+        ),
+    ]
@@ -1,9 +1,71 @@
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce, Upper
 
 from kuma.documenturls.models import DocumentURL
 
 
+class BookmarkQuerySet(models.QuerySet):
+    def set_display_titles(self, bookmarks):
+        """
+        Clear the custom names that are just the title of their document and
+        set the display titles of `bookmarks`, without saving them.
+
+        The titles of the documents that weren't loaded along with the
+        bookmarks are fetched in a single query.
+        """
+        missing = {
+            bookmark.documenturl_id
+            for bookmark in bookmarks
+            if not Bookmark.documenturl.is_cached(bookmark)
+        }
+        titles = dict(
+            DocumentURL.objects.filter(pk__in=missing)
+            .annotate(
+                title=Coalesce(
+                    KT("metadata__title"), Value(""), output_field=models.TextField()
+                )
+            )
+            .values_list("pk", "title")
+        )
+        for bookmark in bookmarks:
+            if Bookmark.documenturl.is_cached(bookmark):
+                # Documents may not have any metadata (yet).
+                title = (bookmark.documenturl.metadata or {}).get("title") or ""
+            else:
+                title = titles[bookmark.documenturl_id]
+            if bookmark.custom_name == title:
+                bookmark.custom_name = ""
+            bookmark.display_title = bookmark.custom_name or title
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        self.set_display_titles(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if "custom_name" in fields:
+            self.set_display_titles(objs)
+            fields = {*fields, "display_title"}
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update_display_titles(self):
+        """
+        Store the current title of their document as the display title of
+        the bookmarks without a custom name, e.g. after it was refreshed.
+        """
+        document_title = DocumentURL.objects.filter(pk=OuterRef("documenturl")).values(
+            title=KT("metadata__title")
+        )
+        return self.filter(custom_name="").update(
+            display_title=Coalesce(Subquery(document_title), Value(""))
+        )
+
+
 class Bookmark(models.Model):
     documenturl = models.ForeignKey(
         DocumentURL, on_delete=models.CASCADE, verbose_name="Document URL"
@@ -11,17 +73,41 @@ class Bookmark(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     custom_name = models.CharField(max_length=500, blank=True)
     notes = models.CharField(max_length=500, blank=True)
+    # The custom name, or else the title of the document, stored to be
+    # searched and sorted by.
+    display_title = models.TextField(blank=True, default="")
     deleted = models.DateTimeField(null=True)
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
+    objects = BookmarkQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Bookmark"
         unique_together = ["documenturl", "user_id"]
+        indexes = [
+            models.Index(
+                fields=["user", "display_title"],
+                condition=Q(deleted__isnull=True),
+                name="bookmark_user_title_idx",
+            ),
+            # `icontains` is `UPPER(...) LIKE UPPER(...)`, which these serve.
+            GinIndex(
+                OpClass(Upper("display_title"), name="gin_trgm_ops"),
+                name="bookmark_title_trgm_idx",
+            ),
+            GinIndex(
+                OpClass(Upper("notes"), name="gin_trgm_ops"),
+                name="bookmark_notes_trgm_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        if self.custom_name == self.documenturl.metadata["title"]:
-            self.custom_name = ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "custom_name" in update_fields:
+            Bookmark.objects.set_display_titles([self])
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "display_title"}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -29,4 +115,4 @@ class Bookmark(models.Model):
 
     @property
     def title(self):
-        return self.custom_name or self.documenturl.metadata["title"]
+        return self.custom_name or (self.documenturl.metadata or {}).get("title", "")
@@ -0,0 +1,74 @@
+import pytest
+from django.contrib.auth.models import User
+from model_bakery import baker
+
+from kuma.bookmarks.models import Bookmark
+from kuma.documenturls.models import DocumentURL
+
+
+def make_documenturl(name):
+    return DocumentURL.objects.create(
+        uri=f"/en-us/docs/{name.lower()}",
+        absolute_url=f"https://developer.example.com/en-US/docs/{name}/index.json",
+        metadata={"title": name},
+    )
+
+
+@pytest.mark.django_db
+def test_save_sets_display_title(wiki_user):
+    documenturl = make_documenturl("Fetch")
+    bookmark = Bookmark.objects.create(
+        user=wiki_user, documenturl=documenturl, custom_name="Fetch"
+    )
+    assert bookmark.custom_name == ""
+    assert bookmark.display_title == "Fetch"
+
+    bookmark = Bookmark.objects.get(id=bookmark.id)
+    bookmark.custom_name = "My fetch"
+    bookmark.save(update_fields=["custom_name"])
+    bookmark.refresh_from_db()
+    assert bookmark.display_title == "My fetch"
+
+
+@pytest.mark.django_db
+def test_bulk_update_in_constant_queries(wiki_user, django_assert_num_queries):
+    for name in ("Fetch", "Array", "Promise", "Map", "Set"):
+        Bookmark.objects.create(user=wiki_user, documenturl=make_documenturl(name))
+
+    bookmarks = list(Bookmark.objects.order_by("id"))
+    for bookmark in bookmarks:
+        bookmark.custom_name = bookmark.display_title.upper()
+    bookmarks[0].custom_name = "Fetch"
+    # One query for the document titles and one for the update.
+    with django_assert_num_queries(2):
+        Bookmark.objects.bulk_update(bookmarks, ["custom_name", "notes"])
+
+    assert list(
+        Bookmark.objects.order_by("id").values_list("custom_name", "display_title")
+    ) == [
+        ("", "Fetch"),
+        ("ARRAY", "ARRAY"),
+        ("PROMISE", "PROMISE"),
+        ("MAP", "MAP"),
+        ("SET", "SET"),
+    ]
+
+
+@pytest.mark.django_db
+def test_display_title_without_metadata(wiki_user):
+    documenturl = DocumentURL.objects.create(
+        uri="/en-us/docs/legacy",
+        absolute_url="https://developer.example.com/en-US/docs/Legacy/index.json",
+        metadata=None,
+    )
+    bookmark = Bookmark.objects.create(user=wiki_user, documenturl=documenturl)
+    assert bookmark.display_title == ""
+    assert bookmark.title == ""
+
+    # Without the document loaded along.
+    bookmarks = list(Bookmark.objects.all())
+    Bookmark.objects.bulk_update(bookmarks, ["custom_name"])
+    Bookmark.objects.bulk_create(
+        [Bookmark(user=baker.make(User), documenturl_id=documenturl.id)]
+    )
+    assert set(Bookmark.objects.values_list("display_title", flat=True)) == {""}
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+
+from kuma.bookmarks.models import Bookmark
+from kuma.core.utils import bump_versions
+
+BOOKMARK_COUNT_CACHE_KEY = "bookmarks:count:{}"
+BOOKMARK_COUNT_TIMEOUT = 60 * 60 * 24
+
+
+def get_bookmark_count(user_id):
+    """The number of (not deleted) bookmarks of a user."""
+    key = BOOKMARK_COUNT_CACHE_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Bookmark.objects.filter(user_id=user_id, deleted=None).count()
+        # Don't overwrite what a concurrent request seeded and adjusted since.
+        cache.add(key, count, BOOKMARK_COUNT_TIMEOUT)
+    return count
+
+
+def adjust_bookmark_count(user_id, delta):
+    """
+    Add `delta` to the user's bookmark count, after the bookmarks were saved
+    or deleted, and return the new count.
+    """
+    try:
+        return cache.incr(BOOKMARK_COUNT_CACHE_KEY.format(user_id), delta)
+    except ValueError:
+        # Nothing cached (anymore), the database already has the change.
+        return get_bookmark_count(user_id)
+
+
+def reserve_bookmark_count(user_id, delta):
+    """
+    Add `delta` to the user's bookmark count before saving the bookmarks and
+    return the new count.
+
+    Being atomic, this reserves room for new bookmarks so that concurrent
+    requests can't exceed the subscription limit together. Release it with
+    `adjust_bookmark_count(user_id, -delta)` if they don't get saved.
+    """
+    key = BOOKMARK_COUNT_CACHE_KEY.format(user_id)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Nothing cached (anymore), the database doesn't have the change yet.
+        count = get_bookmark_count(user_id)
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            return count + delta
+
+
+def bump_bookmark_versions(documenturls):
+    """Tell the users who bookmarked `documenturls` that their bookmarks changed."""
+    bump_versions(
+        "bookmarks",
+        Bookmark.objects.filter(documenturl__in=documenturls)
+        .values_list("user_id", flat=True)
+        .distinct(),
+    )
@@ -6,6 +6,8 @@ from django.urls import set_urlconf
 from django.utils import timezone
 from django.utils.translation import activate
 
+from kuma.documenturls.utils import recent_metadata
+from kuma.users.jwks import jwks
 from kuma.users.models import UserProfile
 
 
@@ -15,6 +17,8 @@ def clear_cache():
     Before every pytest test function starts, it clears the cache.
     """
     caches["default"].clear()
+    recent_metadata.clear()
+    jwks.clear()
 
 
 @pytest.fixture(autouse=True)
@@ -20,12 +20,31 @@ class CoreConfig(AppConfig):
         self.add_periodc_tasks()
 
     def add_periodc_tasks(self):
-        from kuma.core.tasks import clean_sessions, clear_old_notifications
+        from kuma.core.tasks import (
+            clean_sessions,
+            clear_old_notifications,
+            reconcile_unread_notification_counts,
+        )
+        from kuma.documenturls.tasks import (
+            preload_documenturl_metadata,
+            revalidate_documenturls,
+        )
+        from kuma.users.tasks import delete_pending_users, process_pending_events
 
         # Clean up expired sessions every 60 minutes
         app.add_periodic_task(60 * 60, clean_sessions.s())
-        # Delete old notifications every month
-        app.add_periodic_task(60 * 60 * 24 * 30, clear_old_notifications.s())
+        # Delete old notifications every day
+        app.add_periodic_task(60 * 60 * 24, clear_old_notifications.s())
+        # Correct drift in the unread notification counters every hour
+        app.add_periodic_task(60 * 60, reconcile_unread_notification_counts.s())
+        # Know the titles of new documents every day
+        app.add_periodic_task(60 * 60 * 24, preload_documenturl_metadata.s())
+        # Check bookmarked documents still exist and refresh them every hour
+        app.add_periodic_task(60 * 60, revalidate_documenturls.s())
+        # Process the account events that weren't processed right away
+        app.add_periodic_task(60 * 10, process_pending_events.s())
+        # Finish the deletions of users that failed
+        app.add_periodic_task(60 * 60, delete_pending_users.s())
 
     @cached_property
     def language_mapping(self):
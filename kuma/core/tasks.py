@@ -1,13 +1,30 @@
-from datetime import datetime, timedelta
+import logging
+import time
+from datetime import timedelta
+from itertools import islice
 
 from celery.task import task
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.utils import timezone
 
 from ..notifications.models import Notification, NotificationData
+from ..notifications.utils import reconcile_unread_counts
 from .decorators import skip_in_maintenance_mode
+from .utils import delete_in_batches
+
+log = logging.getLogger("kuma.core.tasks")
 
 LOCK_ID = "clean-sessions-lock"
 LOCK_EXPIRE = 60 * 5
+SESSION_CLEANUP_BATCHES = 10
+NOTIFICATIONS_LOCK_ID = "clear-old-notifications-lock"
+NOTIFICATIONS_CHECKPOINT_ID = "clear-old-notifications-checkpoint"
+NOTIFICATIONS_CHECKPOINT_EXPIRE = 60 * 60 * 24 * 7
+NOTIFICATIONS_MAX_AGE = timedelta(days=6 * 30)
+UNREAD_COUNT_RECONCILE_CHUNK_SIZE = 1000
 
 
 def get_expired_sessions(now):
@@ -18,56 +35,115 @@ def get_expired_sessions(now):
 @skip_in_maintenance_mode
 def clean_sessions():
     """
-    Queue deleting expired session items without breaking poor MySQL
+    Delete expired sessions from the database, in batches
+
+    Every run deletes at most `SESSION_CLEANUP_BATCHES` batches and queues
+    another run while expired sessions remain, so that no run, or lock,
+    lasts long.
     """
-    import warnings
+    now = timezone.now()
+    if not cache.add(LOCK_ID, now.strftime("%c"), LOCK_EXPIRE):
+        log.error(
+            "The clean_sessions task is already running since %s" % cache.get(LOCK_ID)
+        )
+        return
 
-    warnings.warn(
-        "clean_sessions() is disabled at the moment because depends "
-        "doing raw SQL queries which might not make sense if you start "
-        "with a completely empty database."
-    )
-    # now = timezone.now()
-    # logger = clean_sessions.get_logger()
-    # chunk_size = settings.SESSION_CLEANUP_CHUNK_SIZE
-
-    # if cache.add(LOCK_ID, now.strftime("%c"), LOCK_EXPIRE):
-    #     total_count = get_expired_sessions(now).count()
-    #     delete_count = 0
-    #     logger.info(
-    #         "Deleting the %s of %s oldest expired sessions" % (chunk_size, total_count)
-    #     )
-    #     try:
-    #         cursor = connection.cursor()
-    #         delete_count = cursor.execute(
-    #             """
-    #             DELETE
-    #             FROM django_session
-    #             WHERE expire_date < NOW()
-    #             ORDER BY expire_date ASC
-    #             LIMIT %s;
-    #             """,
-    #             [chunk_size],
-    #         )
-    #     finally:
-    #         logger.info("Deleted %s expired sessions" % delete_count)
-    #         cache.delete(LOCK_ID)
-    #         expired_sessions = get_expired_sessions(now)
-    #         if expired_sessions.exists():
-    #             clean_sessions.apply_async()
-    # else:
-    #     logger.error(
-    #         "The clean_sessions task is already running since %s" % cache.get(LOCK_ID)
-    #     )
+    try:
+        started = time.monotonic()
+        deleted = 0
+        # Session keys are strings, which all sort after the empty one.
+        batches = delete_in_batches(
+            get_expired_sessions(now), settings.SESSION_CLEANUP_CHUNK_SIZE, start=""
+        )
+        for _, count, _ in islice(batches, SESSION_CLEANUP_BATCHES):
+            deleted += count
+            cache.touch(LOCK_ID, LOCK_EXPIRE)
+        elapsed = time.monotonic() - started
+        stats = {
+            "deleted": deleted,
+            "seconds": round(elapsed, 3),
+            "per_second": round(deleted / elapsed, 1) if elapsed else 0,
+            "remaining": get_expired_sessions(now).exists(),
+        }
+        log.info(
+            "Deleted %(deleted)s expired sessions in %(seconds)ss "
+            "(%(per_second)s/s)" % stats
+        )
+    finally:
+        cache.delete(LOCK_ID)
+
+    if stats["remaining"]:
+        clean_sessions.apply_async()
+    return stats
 
 
 @task
 @skip_in_maintenance_mode
 def clear_old_notifications():
     """
-    Delete old notifications from the database
+    Delete old and deleted notifications from the database, in batches
+
+    Progress is checkpointed in the cache, so an interrupted run picks up
+    where it stopped the next time around.
     """
-    NotificationData.objects.filter(
-        created__lt=datetime.now() - timedelta(days=6 * 30)
-    ).delete()
-    Notification.objects.filter(deleted=True).delete()
+    now = timezone.now()
+    if not cache.add(NOTIFICATIONS_LOCK_ID, now.strftime("%c"), LOCK_EXPIRE):
+        log.error(
+            "The clear_old_notifications task is already running since %s"
+            % cache.get(NOTIFICATIONS_LOCK_ID)
+        )
+        return
+
+    try:
+        chunk_size = settings.NOTIFICATIONS_CLEANUP_CHUNK_SIZE
+        checkpoint = cache.get(NOTIFICATIONS_CHECKPOINT_ID) or {}
+        querysets = {
+            "notificationdata": NotificationData.objects.filter(
+                created__lt=now - NOTIFICATIONS_MAX_AGE
+            ),
+            "notification": Notification.objects.filter(deleted=True),
+        }
+        totals = {}
+        for name, queryset in querysets.items():
+            totals[name] = 0
+            for last_pk, deleted, elapsed in delete_in_batches(
+                queryset, chunk_size, start=checkpoint.get(name, 0)
+            ):
+                totals[name] += deleted
+                checkpoint[name] = last_pk
+                cache.set(
+                    NOTIFICATIONS_CHECKPOINT_ID,
+                    checkpoint,
+                    NOTIFICATIONS_CHECKPOINT_EXPIRE,
+                )
+                cache.touch(NOTIFICATIONS_LOCK_ID, LOCK_EXPIRE)
+                log.info(
+                    "Deleted %s rows from %s up to id %s in %.3fs"
+                    % (deleted, name, last_pk, elapsed)
+                )
+        cache.delete(NOTIFICATIONS_CHECKPOINT_ID)
+        log.info("Deleted %s old notification rows" % totals)
+        return totals
+    finally:
+        cache.delete(NOTIFICATIONS_LOCK_ID)
+
+
+@task
+@skip_in_maintenance_mode
+def reconcile_unread_notification_counts():
+    """
+    Correct any drift in the cached unread notification counters
+    """
+    user_ids = (
+        get_user_model()
+        .objects.filter(notification__isnull=False)
+        .order_by("id")
+        .values_list("id", flat=True)
+        .distinct()
+    )
+    last_id = 0
+    while chunk := list(
+        user_ids.filter(id__gt=last_id)[:UNREAD_COUNT_RECONCILE_CHUNK_SIZE]
+    ):
+        reconcile_unread_counts(chunk)
+        last_id = chunk[-1]
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.utils import timezone
+from model_bakery import baker
+
+from kuma.core.tasks import (
+    LOCK_ID,
+    NOTIFICATIONS_CHECKPOINT_ID,
+    NOTIFICATIONS_LOCK_ID,
+    clean_sessions,
+    clear_old_notifications,
+)
+from kuma.notifications.models import Notification, NotificationData
+
+
+@pytest.mark.django_db
+def test_clear_old_notifications(settings):
+    settings.NOTIFICATIONS_CLEANUP_CHUNK_SIZE = 2
+    old = baker.make(NotificationData, _quantity=3)
+    NotificationData.objects.filter(pk__in=[data.pk for data in old]).update(
+        created=timezone.now() - timedelta(days=365)
+    )
+    for data in old:
+        baker.make(Notification, notification=data)
+    recent = baker.make(NotificationData)
+    kept = baker.make(Notification, notification=recent)
+    baker.make(Notification, notification=recent, deleted=True, _quantity=3)
+
+    totals = clear_old_notifications()
+
+    # 3 old notification data rows, plus their cascaded notifications.
+    assert totals == {"notificationdata": 6, "notification": 3}
+    assert list(NotificationData.objects.all()) == [recent]
+    assert list(Notification.objects.all()) == [kept]
+    assert cache.get(NOTIFICATIONS_CHECKPOINT_ID) is None
+    assert cache.get(NOTIFICATIONS_LOCK_ID) is None
+
+
+@pytest.mark.django_db
+def test_clear_old_notifications_resumes_from_checkpoint():
+    deleted = baker.make(Notification, deleted=True, _quantity=3)
+    cache.set(NOTIFICATIONS_CHECKPOINT_ID, {"notification": deleted[0].pk})
+
+    assert clear_old_notifications() == {"notificationdata": 0, "notification": 2}
+    assert list(Notification.objects.all()) == [deleted[0]]
+
+
+@pytest.mark.django_db
+def test_clear_old_notifications_locked():
+    baker.make(Notification, deleted=True)
+    cache.add(NOTIFICATIONS_LOCK_ID, "earlier")
+
+    assert clear_old_notifications() is None
+    assert Notification.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_clean_sessions(settings, monkeypatch):
+    settings.SESSION_CLEANUP_CHUNK_SIZE = 2
+    monkeypatch.setattr("kuma.core.tasks.SESSION_CLEANUP_BATCHES", 1)
+    now = timezone.now()
+    for i in range(5):
+        Session.objects.create(
+            session_key=f"expired{i}", session_data="", expire_date=now - timedelta(1)
+        )
+    Session.objects.create(
+        session_key="current", session_data="", expire_date=now + timedelta(1)
+    )
+
+    # The first run only deletes one batch, and queues the next runs.
+    stats = clean_sessions()
+    assert stats["deleted"] == 2
+    assert stats["remaining"]
+    assert list(Session.objects.values_list("session_key", flat=True)) == ["current"]
+    assert not cache.get(LOCK_ID)
@@ -1,14 +1,20 @@
+from unittest import mock
+
 import pytest
 from django.core import mail
 from django.core.mail.backends.locmem import EmailBackend
+from django.db import transaction
+from model_bakery import baker
 from requests.exceptions import ConnectionError
 
 from kuma.core.utils import (
     EmailMultiAlternativesRetrying,
+    delete_in_batches,
     order_params,
     requests_retry_session,
     send_mail_retrying,
 )
+from kuma.notifications.models import Notification
 
 
 @pytest.mark.parametrize(
@@ -97,3 +103,22 @@ def test_EmailMultiAlternativesRetrying(settings):
     sent = mail.outbox[-1]
     # sanity check
     assert sent.subject == "Multi Subject"
+
+
+@pytest.mark.django_db
+def test_delete_in_batches_rechecks_the_filter():
+    notifications = baker.make(Notification, deleted=True, _quantity=3)
+    atomic = transaction.atomic
+
+    def restore_first(*args, **kwargs):
+        # Undone while the batch is being deleted.
+        Notification.objects.filter(pk=notifications[0].pk).update(deleted=False)
+        return atomic(*args, **kwargs)
+
+    with mock.patch("kuma.core.utils.transaction.atomic", side_effect=restore_first):
+        batches = list(
+            delete_in_batches(Notification.objects.filter(deleted=True), chunk_size=3)
+        )
+
+    assert batches[0][:2] == (notifications[-1].pk, 2)
+    assert list(Notification.objects.all()) == [notifications[0]]
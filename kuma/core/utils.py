@@ -1,10 +1,13 @@
 import logging
+import time
 from smtplib import SMTPConnectError, SMTPServerDisconnected
 from urllib.parse import ParseResult, parse_qsl, urlparse, urlsplit, urlunsplit
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
 from django.http import QueryDict
 from django.utils.cache import patch_cache_control
 from django.utils.encoding import smart_bytes
@@ -15,6 +18,9 @@ from urllib3.util.retry import Retry
 
 log = logging.getLogger("kuma.core.utils")
 
+VERSION_CACHE_KEY = "version:{}:{}"
+VERSION_TIMEOUT = 60 * 60 * 24
+
 
 def urlparams(url_, fragment=None, query_dict=None, **query):
     """
@@ -95,6 +101,7 @@ def requests_retry_session(
     retries=3,
     backoff_factor=0.3,
     status_forcelist=(500, 502, 504),
+    pool_maxsize=requests.adapters.DEFAULT_POOLSIZE,
 ):
     """Opinionated wrapper that creates a requests session with a
     HTTPAdapter that sets up a Retry policy that includes connection
@@ -114,6 +121,9 @@ def requests_retry_session(
     A default of retries=3 and backoff_factor=0.3 means it will sleep like::
 
         [0.3, 0.6, 1.2]
+
+    The pool_maxsize is the number of connections kept open per host, which
+    should be at least the number of threads sharing the session.
     """  # noqa
     session = requests.Session()
     retry = Retry(
@@ -123,7 +133,7 @@ def requests_retry_session(
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
@@ -193,3 +203,73 @@ class EmailMultiAlternativesRetrying(EmailMultiAlternatives):
         parent_method = super(EmailMultiAlternativesRetrying, self).send
         with retrying(parent_method, **retry_options) as method:
             return method(*args, **kwargs)
+
+
+def get_versions(scopes):
+    """
+    The current versions of some data, e.g. `("bookmarks", user_id)`, for
+    telling whether it changed. Shared data uses `None` as its user id.
+
+    A version that isn't cached (anymore) starts anew from the current time,
+    so it never repeats one handed out before.
+    """
+    keys = {VERSION_CACHE_KEY.format(*scope): scope for scope in scopes}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, time.time_ns(), VERSION_TIMEOUT)
+        versions[key] = cache.get(key)
+    return {scope: versions[key] for key, scope in keys.items()}
+
+
+def bump_versions(name, user_ids):
+    """Tell that the `name` data of some users (or `[None]`) changed."""
+    for user_id in user_ids:
+        try:
+            cache.incr(VERSION_CACHE_KEY.format(name, user_id))
+        except ValueError:
+            # Not cached, so the next version is a new one anyway.
+            pass
+
+
+def save_changes(instance, **values):
+    """
+    Set the fields of a model instance to `values`, and save only those that
+    changed, if any. Returns the names of the changed fields.
+    """
+    changed = [
+        name for name, value in values.items() if getattr(instance, name) != value
+    ]
+    if not changed:
+        return changed
+    for name in changed:
+        setattr(instance, name, values[name])
+    update_fields = set(changed)
+    if any(field.name == "modified" for field in instance._meta.concrete_fields):
+        update_fields.add("modified")
+    instance.save(update_fields=update_fields)
+    return changed
+
+
+def delete_in_batches(queryset, chunk_size, start=0):
+    """
+    Delete the rows of `queryset` in primary key order, `chunk_size` at a
+    time and each batch in its own short transaction.
+
+    Yields the last primary key, the number of rows deleted (cascades
+    included) and the seconds taken, for every batch.
+    """
+    last_pk = start
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:chunk_size]
+        )
+        if not pks:
+            return
+        started = time.monotonic()
+        with transaction.atomic():
+            # Through `queryset`, to skip rows that stopped matching since.
+            deleted, _ = queryset.filter(pk__in=pks).delete()
+        last_pk = pks[-1]
+        yield last_pk, deleted, time.monotonic() - started
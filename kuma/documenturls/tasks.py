@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import requests
+from celery.task import task
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from kuma.bookmarks.models import Bookmark
+from kuma.bookmarks.utils import bump_bookmark_versions
+from kuma.core.decorators import skip_in_maintenance_mode
+from kuma.core.utils import requests_retry_session
+
+from .models import DocumentURL, DocumentURLCheck, download_url
+from .utils import extract_metadata, set_metadata
+
+log = logging.getLogger("kuma.documenturls.tasks")
+
+REVALIDATION_LOCK_ID = "revalidate-documenturls-lock"
+REVALIDATION_LOCK_EXPIRE = 60 * 30
+REVALIDATION_STATS_ID = "revalidate-documenturls-stats"
+REVALIDATION_TIMEOUT = 10
+
+
+@task
+def refresh_documenturl_metadata(uri):
+    """Download the `index.json` of a DocumentURL and store its metadata."""
+    documenturl = DocumentURL.objects.get(uri=uri)
+    try:
+        response = download_url(documenturl.absolute_url)
+    except requests.exceptions.HTTPError as error:
+        if error.response.status_code not in (404, 410):
+            raise
+        documenturl.invalid = timezone.now()
+        documenturl.save(update_fields=["invalid", "modified"])
+        return
+
+    documenturl.metadata = extract_metadata(response.json()["doc"])
+    documenturl.invalid = None
+    documenturl.save(update_fields=["metadata", "invalid", "modified"])
+    Bookmark.objects.filter(documenturl=documenturl).update_display_titles()
+    set_metadata({uri: documenturl.metadata})
+    bump_bookmark_versions([documenturl])
+
+
+@task
+@skip_in_maintenance_mode
+def preload_documenturl_metadata():
+    """
+    Remember the titles of all documents from Yari's search indexes, so that
+    new DocumentURLs start out with their real title.
+    """
+    for locale in settings.DOCUMENTURL_PRELOAD_LOCALES:
+        url = f"{settings.BOOKMARKS_BASE_URL}/{locale}/search-index.json"
+        try:
+            documents = download_url(url).json()
+        except requests.exceptions.RequestException as error:
+            log.warning("Unable to preload document metadata from %s: %s", url, error)
+            continue
+        set_metadata(
+            {
+                document["url"]: {
+                    "title": document["title"],
+                    "mdn_url": document["url"],
+                }
+                for document in documents
+            }
+        )
+        log.info("Preloaded the metadata of %d %s documents", len(documents), locale)
+
+
+def documenturls_to_revalidate(checked_before):
+    """
+    DocumentURLs not checked since `checked_before`, the most bookmarked and
+    then the least recently checked first.
+    """
+    last_check = DocumentURLCheck.objects.filter(document_url=OuterRef("pk")).order_by(
+        "-created"
+    )
+    return (
+        DocumentURL.objects.annotate(
+            bookmarks=Count("bookmark"),
+            last_checked=Subquery(last_check.values("created")[:1]),
+            last_headers=Subquery(last_check.values("headers")[:1]),
+        )
+        .filter(Q(last_checked__isnull=True) | Q(last_checked__lt=checked_before))
+        .order_by("-bookmarks", F("last_checked").asc(nulls_first=True), "id")
+    )
+
+
+def conditional_headers(documenturl):
+    """Request headers to only download the document if it changed."""
+    if documenturl.invalid or not documenturl.last_headers:
+        return {}
+    headers = {key.lower(): value for key, value in documenturl.last_headers.items()}
+    conditional = {}
+    if "etag" in headers:
+        conditional["If-None-Match"] = headers["etag"]
+    if "last-modified" in headers:
+        conditional["If-Modified-Since"] = headers["last-modified"]
+    return conditional
+
+
+def fetch_documenturl(session, semaphores, documenturl):
+    with semaphores[urlsplit(documenturl.absolute_url).netloc]:
+        return session.get(
+            documenturl.absolute_url,
+            headers=conditional_headers(documenturl),
+            allow_redirects=False,
+            timeout=REVALIDATION_TIMEOUT,
+        )
+
+
+def update_documenturl(documenturl, response, now):
+    """
+    Update a DocumentURL from the response of checking it, and return the
+    outcome: "modified", "not_modified", "invalid" or "failed".
+    """
+    if response.status_code == 304:
+        return "not_modified"
+    if response.status_code in (404, 410):
+        if not documenturl.invalid:
+            documenturl.invalid = now
+            documenturl.modified = now
+        return "invalid"
+    if response.status_code != 200:
+        return "failed"
+    try:
+        metadata = extract_metadata(response.json()["doc"])
+    except (ValueError, KeyError):
+        return "failed"
+    if metadata == documenturl.metadata and not documenturl.invalid:
+        return "not_modified"
+    documenturl.metadata = metadata
+    documenturl.invalid = None
+    documenturl.modified = now
+    return "modified"
+
+
+@task
+@skip_in_maintenance_mode
+def revalidate_documenturls():
+    """
+    Check that DocumentURLs are still valid and refresh their metadata, many
+    of them concurrently but only a few at a time per host.
+    """
+    now = timezone.now()
+    if not cache.add(
+        REVALIDATION_LOCK_ID, now.strftime("%c"), REVALIDATION_LOCK_EXPIRE
+    ):
+        log.error(
+            "The revalidate_documenturls task is already running since %s"
+            % cache.get(REVALIDATION_LOCK_ID)
+        )
+        return
+
+    try:
+        per_host = settings.DOCUMENTURL_REVALIDATION_HOST_CONCURRENCY
+        documenturls = list(
+            documenturls_to_revalidate(
+                now - timedelta(seconds=settings.DOCUMENTURL_REVALIDATION_INTERVAL)
+            )[: settings.DOCUMENTURL_REVALIDATION_BATCH_SIZE]
+        )
+        semaphores = {
+            host: threading.BoundedSemaphore(per_host)
+            for host in {urlsplit(d.absolute_url).netloc for d in documenturls}
+        }
+        session = requests_retry_session(pool_maxsize=per_host)
+        started = time.monotonic()
+        outcomes = Counter()
+        checks = []
+        changed = []
+
+        # Only the requests happen in the threads, the database is only used
+        # from this one.
+        with ThreadPoolExecutor(
+            max_workers=settings.DOCUMENTURL_REVALIDATION_CONCURRENCY
+        ) as executor:
+            futures = {
+                executor.submit(
+                    fetch_documenturl, session, semaphores, documenturl
+                ): documenturl
+                for documenturl in documenturls
+            }
+            for future in as_completed(futures):
+                documenturl = futures[future]
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as error:
+                    log.warning("Unable to check %s: %s", documenturl.uri, error)
+                    outcomes["failed"] += 1
+                    continue
+                checks.append(
+                    DocumentURLCheck(
+                        document_url=documenturl,
+                        http_error=response.status_code,
+                        headers=dict(response.headers),
+                    )
+                )
+                outcomes[update_documenturl(documenturl, response, now)] += 1
+                if documenturl.modified == now:
+                    changed.append(documenturl)
+
+        DocumentURL.objects.bulk_update(changed, ["metadata", "invalid", "modified"])
+        Bookmark.objects.filter(documenturl__in=changed).update_display_titles()
+        set_metadata({d.uri: d.metadata for d in changed if not d.invalid})
+        if changed:
+            bump_bookmark_versions(changed)
+        # Like `DocumentURLCheck.check_uri(cleanup_old=True)`, only keep the
+        # latest check of every DocumentURL.
+        checks = DocumentURLCheck.objects.bulk_create(checks)
+        DocumentURLCheck.objects.filter(
+            document_url__in=[check.document_url_id for check in checks]
+        ).exclude(id__in=[check.id for check in checks]).delete()
+
+        elapsed = time.monotonic() - started
+        stats = {
+            "checked": len(documenturls),
+            "modified": outcomes["modified"],
+            "not_modified": outcomes["not_modified"],
+            "invalid": outcomes["invalid"],
+            "failed": outcomes["failed"],
+            "seconds": round(elapsed, 3),
+            "per_second": round(len(documenturls) / elapsed, 1) if elapsed else 0,
+        }
+        cache.set(REVALIDATION_STATS_ID, {"finished": now, **stats}, None)
+        log.info(
+            "Revalidated %(checked)s document URLs in %(seconds)ss "
+            "(%(per_second)s/s): %(modified)s modified, %(not_modified)s not "
+            "modified, %(invalid)s invalid and %(failed)s failed" % stats
+        )
+        return stats
+    finally:
+        cache.delete(REVALIDATION_LOCK_ID)
@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from model_bakery import baker
+
+from kuma.bookmarks.models import Bookmark
+from kuma.core.utils import get_versions
+from kuma.documenturls.models import DocumentURL, DocumentURLCheck
+from kuma.documenturls.tasks import (
+    documenturls_to_revalidate,
+    refresh_documenturl_metadata,
+    revalidate_documenturls,
+)
+from kuma.documenturls.utils import get_metadata
+
+ABSOLUTE_URL = "https://developer.example.com/en-US/docs/Web/index.json"
+
+
+@pytest.mark.django_db
+def test_refresh_documenturl_metadata(mock_requests):
+    documenturl = DocumentURL.objects.create(
+        uri="/en-us/docs/web",
+        absolute_url=ABSOLUTE_URL,
+        metadata={"title": "Web", "mdn_url": "/en-US/docs/Web"},
+    )
+    doc = {
+        "title": "Web technology for developers",
+        "mdn_url": "/en-US/docs/Web",
+        "parents": [{"uri": "/en-US/docs/Web", "title": "Web"}],
+        "body": [{"type": "prose"}],
+    }
+    mock_requests.get(ABSOLUTE_URL, json={"doc": doc})
+
+    refresh_documenturl_metadata("/en-us/docs/web")
+
+    documenturl.refresh_from_db()
+    assert documenturl.metadata == {
+        "title": "Web technology for developers",
+        "mdn_url": "/en-US/docs/Web",
+        "parents": [{"uri": "/en-US/docs/Web", "title": "Web"}],
+    }
+    assert not documenturl.invalid
+    assert get_metadata("/en-US/docs/Web") == documenturl.metadata
+
+
+@pytest.mark.django_db
+def test_refresh_documenturl_metadata_not_found(mock_requests):
+    documenturl = DocumentURL.objects.create(
+        uri="/en-us/docs/web", absolute_url=ABSOLUTE_URL, metadata={"title": "Web"}
+    )
+    mock_requests.get(ABSOLUTE_URL, status_code=404)
+
+    refresh_documenturl_metadata("/en-us/docs/web")
+
+    documenturl.refresh_from_db()
+    assert documenturl.invalid
+    assert documenturl.metadata == {"title": "Web"}
+
+
+@pytest.mark.django_db
+def test_revalidate_documenturls(mock_requests, wiki_user, django_user_model):
+    base_url = "https://developer.example.com"
+    documenturls = {
+        name: DocumentURL.objects.create(
+            uri=f"/en-us/docs/{name}",
+            absolute_url=f"{base_url}/en-US/docs/{name}/index.json",
+            metadata={"title": name},
+        )
+        for name in ("unchanged", "changed", "gone", "recent")
+    }
+    other_user = baker.make(django_user_model)
+    for user in (wiki_user, other_user):
+        baker.make(Bookmark, user=user, documenturl=documenturls["unchanged"])
+    baker.make(Bookmark, user=wiki_user, documenturl=documenturls["changed"])
+    old_check = baker.make(
+        DocumentURLCheck,
+        document_url=documenturls["unchanged"],
+        http_error=200,
+        headers={"ETag": '"abc"'},
+    )
+    DocumentURLCheck.objects.filter(id=old_check.id).update(
+        created=timezone.now() - timedelta(days=2)
+    )
+    baker.make(DocumentURLCheck, document_url=documenturls["recent"], http_error=200)
+    scopes = [("bookmarks", wiki_user.id), ("bookmarks", other_user.id)]
+    versions = get_versions(scopes)
+
+    assert [d.uri for d in documenturls_to_revalidate(timezone.now())] == [
+        "/en-us/docs/unchanged",
+        "/en-us/docs/changed",
+        "/en-us/docs/gone",
+        "/en-us/docs/recent",
+    ]
+
+    mock_requests.get(
+        documenturls["unchanged"].absolute_url,
+        status_code=304,
+        request_headers={"If-None-Match": '"abc"'},
+    )
+    mock_requests.get(
+        documenturls["changed"].absolute_url,
+        json={"doc": {"title": "Changed", "mdn_url": "/en-US/docs/changed"}},
+    )
+    mock_requests.get(documenturls["gone"].absolute_url, status_code=404)
+
+    stats = revalidate_documenturls()
+
+    assert stats["checked"] == 3
+    assert stats["modified"] == stats["not_modified"] == stats["invalid"] == 1
+    assert stats["failed"] == 0
+    for documenturl in documenturls.values():
+        documenturl.refresh_from_db()
+    assert documenturls["unchanged"].metadata == {"title": "unchanged"}
+    assert documenturls["changed"].metadata == {
+        "title": "Changed",
+        "mdn_url": "/en-US/docs/changed",
+    }
+    assert documenturls["gone"].invalid
+    assert not documenturls["recent"].invalid
+    # Only the bookmarks of the changed documents are new.
+    new_versions = get_versions(scopes)
+    assert new_versions[scopes[0]] != versions[scopes[0]]
+    assert new_versions[scopes[1]] == versions[scopes[1]]
+    assert dict(
+        DocumentURLCheck.objects.values_list("document_url__uri", "http_error")
+    ) == {
+        "/en-us/docs/unchanged": 304,
+        "/en-us/docs/changed": 200,
+        "/en-us/docs/gone": 404,
+        "/en-us/docs/recent": 200,
+    }
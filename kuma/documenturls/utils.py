@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import DocumentURL
+
+# Because the `index.json` documents are so big, only store certain fields
+# that are used.
+METADATA_KEYS = ("title", "mdn_url", "parents")
+METADATA_CACHE_KEY = "documenturls:metadata:{}"
+METADATA_TIMEOUT = 60 * 60 * 24 * 7
+RECENT_METADATA_SIZE = 1000
+
+
+class LRUCache:
+    """A small, thread-safe, in-process least recently used cache."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                return None
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+recent_metadata = LRUCache(RECENT_METADATA_SIZE)
+
+
+def extract_metadata(doc):
+    return {key: doc[key] for key in METADATA_KEYS if key in doc}
+
+
+def placeholder_metadata(url):
+    """Metadata to use until the real one is downloaded, based on the URL."""
+    slug = url.strip().rstrip("/").rsplit("/", 1)[-1]
+    return {"title": slug.replace("_", " "), "mdn_url": url.strip()}
+
+
+def get_metadata(uri):
+    """Known metadata of a URI, from recent lookups or the shared cache."""
+    uri = DocumentURL.normalize_uri(uri)
+    metadata = recent_metadata.get(uri)
+    if metadata is None:
+        metadata = cache.get(METADATA_CACHE_KEY.format(uri))
+        if metadata is not None:
+            recent_metadata.set(uri, metadata)
+    return metadata
+
+
+def set_metadata(metadata_by_uri):
+    """Remember the metadata of many URIs, e.g. from a bulk export."""
+    metadata_by_uri = {
+        DocumentURL.normalize_uri(uri): metadata
+        for uri, metadata in metadata_by_uri.items()
+    }
+    for uri, metadata in metadata_by_uri.items():
+        recent_metadata.set(uri, metadata)
+    cache.set_many(
+        {
+            METADATA_CACHE_KEY.format(uri): metadata
+            for uri, metadata in metadata_by_uri.items()
+        },
+        METADATA_TIMEOUT,
+    )
+
+
+def get_or_create_documenturl(url):
+    """
+    Return the `DocumentURL` of a URL, creating it if it doesn't exist yet.
+
+    New ones never wait for Yari: they get whatever metadata is already known,
+    or a placeholder, and the full metadata is downloaded in the background
+    once the transaction is committed.
+    """
+    from .tasks import refresh_documenturl_metadata
+
+    uri = DocumentURL.normalize_uri(url)
+    documenturl = DocumentURL.objects.filter(uri=uri).first()
+    if documenturl:
+        return documenturl
+
+    documenturl, created = DocumentURL.objects.get_or_create(
+        uri=uri,
+        defaults={
+            "absolute_url": f"{settings.BOOKMARKS_BASE_URL}{url}/index.json",
+            "metadata": get_metadata(uri) or placeholder_metadata(url),
+        },
+    )
+    if created:
+        # Only once it's committed, for the task to find it.
+        transaction.on_commit(lambda: refresh_documenturl_metadata.delay(uri))
+    return documenturl
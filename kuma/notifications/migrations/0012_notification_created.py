@@ -0,0 +1,56 @@
+# Generated by Django 5.0.14 on 2026-10-19 19:32
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_created(apps, schema_editor):
+    Notification = apps.get_model("notifications", "Notification")
+    NotificationData = apps.get_model("notifications", "NotificationData")
+    Notification.objects.update(
+        created=Subquery(
+            NotificationData.objects.filter(pk=OuterRef("notification_id")).values(
+                "created"
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0011_auto_20220210_0921"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="created",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(code=copy_created, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "deleted", "-created", "id"],
+                name="notification_user_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "deleted", "read", "-created", "id"],
+                name="notification_user_read_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "deleted", "starred", "-created", "id"],
+                name="notification_user_starred_idx",
+            ),
+        ),
+    ]
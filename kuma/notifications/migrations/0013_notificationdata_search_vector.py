@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-19 19:36
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0012_notification_created"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationdata",
+            name="search_vector",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.contrib.postgres.search.SearchVector(
+                    "title", "text", config="english"
+                ),
+                output_field=django.contrib.postgres.search.SearchVectorField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notificationdata",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="notificationdata_search_idx"
+            ),
+        ),
+    ]
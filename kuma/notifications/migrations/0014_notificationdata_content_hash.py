@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-19 19:45
+
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+
+
+def content_hash(title, text, type, page_url, data):
+    content = [title, text, type, page_url, data]
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    ).hexdigest()
+
+
+def hash_and_merge_duplicates(apps, schema_editor):
+    NotificationData = apps.get_model("notifications", "NotificationData")
+    Notification = apps.get_model("notifications", "Notification")
+    seen = {}
+    rows = (
+        NotificationData.objects.order_by("id")
+        .values_list("id", "title", "text", "type", "page_url", "data")
+        .iterator()
+    )
+    for id, *content in rows:
+        hash = content_hash(*content)
+        if hash in seen:
+            Notification.objects.filter(notification_id=id).update(
+                notification_id=seen[hash]
+            )
+            NotificationData.objects.filter(id=id).delete()
+        else:
+            seen[hash] = id
+            NotificationData.objects.filter(id=id).update(content_hash=hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0013_notificationdata_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationdata",
+            name="content_hash",
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.RunPython(
+            code=hash_and_merge_duplicates, reverse_code=migrations.RunPython.noop
+        ),
+    ]
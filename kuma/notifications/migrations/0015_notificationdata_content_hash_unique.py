@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0014_notificationdata_content_hash"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="notificationdata",
+            name="content_hash",
+            field=models.CharField(max_length=64, null=True, unique=True),
+        ),
+    ]
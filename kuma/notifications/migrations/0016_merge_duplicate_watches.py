@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_watches(apps, schema_editor):
+    Watch = apps.get_model("notifications", "Watch")
+    UserWatch = apps.get_model("notifications", "UserWatch")
+    duplicates = (
+        Watch.objects.values("url")
+        .annotate(count=Count("id"), keep=Min("id"))
+        .filter(count__gt=1)
+        .values_list("url", "keep")
+    )
+    for url, keep in duplicates.iterator():
+        others = Watch.objects.filter(url=url).exclude(id=keep)
+        # Users watching more than one copy keep their oldest subscription.
+        for user_watch in UserWatch.objects.filter(watch__in=others).order_by("id"):
+            if UserWatch.objects.filter(
+                user_id=user_watch.user_id, watch_id=keep
+            ).exists():
+                user_watch.delete()
+            else:
+                user_watch.watch_id = keep
+                user_watch.save(update_fields=["watch"])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0015_notificationdata_content_hash_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=merge_duplicate_watches, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.14 on 2026-10-19 19:45
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0016_merge_duplicate_watches"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="watch",
+            name="url_hash",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.text.MD5("url"),
+                output_field=models.CharField(max_length=32),
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-19 19:46
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0017_watch_url_hash"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="watch",
+            index=django.contrib.postgres.indexes.HashIndex(
+                fields=["path"], name="notifications_watch_path_idx"
+            ),
+        ),
+    ]
@@ -1,6 +1,14 @@
+import hashlib
+import json
+
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, HashIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.functions import MD5
+from django.utils import timezone
 
 
 class NotificationData(models.Model):
@@ -17,6 +25,28 @@ class NotificationData(models.Model):
     data = models.JSONField(default=dict)
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
+    search_vector = models.GeneratedField(
+        expression=SearchVector("title", "text", config="english"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    # Identifies identical notifications, so they are only stored once.
+    content_hash = models.CharField(max_length=64, unique=True, null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="notificationdata_search_idx")
+        ]
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash()
+        super().save(*args, **kwargs)
+
+    def compute_content_hash(self):
+        content = [self.title, self.text, self.type, self.page_url, self.data]
+        return hashlib.sha256(
+            json.dumps(content, sort_keys=True, cls=DjangoJSONEncoder).encode()
+        ).hexdigest()
 
     def __str__(self):
         return self.title
@@ -28,6 +58,30 @@ class Notification(models.Model):
     starred = models.BooleanField(default=False)
     read = models.BooleanField(default=False)
     deleted = models.BooleanField(default=False)
+    # Denormalized copy of `notification.created` so that listing a user's
+    # notifications can be filtered and sorted without joining.
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "deleted", "-created", "id"],
+                name="notification_user_created_idx",
+            ),
+            models.Index(
+                fields=["user", "deleted", "read", "-created", "id"],
+                name="notification_user_read_idx",
+            ),
+            models.Index(
+                fields=["user", "deleted", "starred", "-created", "id"],
+                name="notification_user_starred_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.notification_id:
+            self.created = self.notification.created
+        super().save(*args, **kwargs)
 
     def serialize(self):
         return {
@@ -44,11 +98,46 @@ class Notification(models.Model):
         return self.notification.title
 
 
+class WatchQuerySet(models.QuerySet):
+    def for_url(self, url):
+        return self.filter(url_hash=Watch.hash_url(url))
+
+    def for_urls(self, urls):
+        return self.filter(url_hash__in=[Watch.hash_url(url) for url in urls])
+
+    def ancestors_of(self, path):
+        """Watches of a BCD path (e.g. `api.Foo.bar`) or of any of its parents."""
+        parts = path.split(".")
+        return self.filter(
+            path__in=[".".join(parts[:i]) for i in range(len(parts), 0, -1)]
+        )
+
+
 class Watch(models.Model):
     users = models.ManyToManyField(User, through="UserWatch")
     title = models.CharField(max_length=2048)
     url = models.TextField()
     path = models.CharField(max_length=4096)
+    # Fixed-size key for `url`, which can be longer than a btree index entry
+    # allows. There is exactly one watch per (normalized) url.
+    url_hash = models.GeneratedField(
+        expression=MD5("url"),
+        output_field=models.CharField(max_length=32),
+        db_persist=True,
+        unique=True,
+    )
+
+    objects = WatchQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # `path` can outgrow a btree entry, and is only matched exactly.
+            HashIndex(fields=["path"], name="notifications_watch_path_idx"),
+        ]
+
+    @staticmethod
+    def hash_url(url):
+        return hashlib.md5(url.encode()).hexdigest()
 
     def __str__(self):
         return f"<Watchers for: {self.url}, {self.path}>"
@@ -1,38 +1,184 @@
 import re
-from collections import defaultdict
+from collections import Counter, defaultdict
 
+from django.core.cache import cache
+from django.db.models import Count
+
+from kuma.core.utils import bump_versions
 from kuma.documenturls.models import DocumentURL
 from kuma.notifications.browsers import browsers
-from kuma.notifications.models import Notification, NotificationData, Watch
+from kuma.notifications.models import Notification, NotificationData, UserWatch, Watch
 
+UNREAD_COUNT_CACHE_KEY = "notifications:unread-count:{}"
+UNREAD_COUNT_TIMEOUT = 60 * 60 * 24
+WATCH_COUNT_CACHE_KEY = "notifications:watch-count:{}"
+WATCH_COUNT_TIMEOUT = 60 * 60 * 24
+
+
+def get_unread_count(user_id):
+    count = cache.get(UNREAD_COUNT_CACHE_KEY.format(user_id))
+    if count is None:
+        count = reconcile_unread_count(user_id)
+    return max(count, 0)
+
+
+def reconcile_unread_count(user_id):
+    count = Notification.objects.filter(
+        user_id=user_id, read=False, deleted=False
+    ).count()
+    set_unread_count(user_id, count)
+    return count
+
+
+def reconcile_unread_counts(user_ids):
+    """Refresh the cached counters, among `user_ids`, that exist."""
+    keys = {UNREAD_COUNT_CACHE_KEY.format(user_id): user_id for user_id in user_ids}
+    cached = [keys[key] for key in cache.get_many(keys)]
+    if not cached:
+        return 0
+    counts = dict.fromkeys(cached, 0)
+    counts.update(
+        Notification.objects.filter(user_id__in=cached, read=False, deleted=False)
+        .values_list("user_id")
+        .annotate(count=Count("id"))
+    )
+    cache.set_many(
+        {
+            UNREAD_COUNT_CACHE_KEY.format(user_id): count
+            for user_id, count in counts.items()
+        },
+        UNREAD_COUNT_TIMEOUT,
+    )
+    return len(counts)
+
+
+def set_unread_count(user_id, count):
+    cache.set(UNREAD_COUNT_CACHE_KEY.format(user_id), count, UNREAD_COUNT_TIMEOUT)
+
+
+def adjust_unread_count(user_id, delta):
+    """
+    Add `delta` to the user's unread count, after the notifications were
+    saved or updated.
+    """
+    if not delta:
+        return
+    try:
+        cache.incr(UNREAD_COUNT_CACHE_KEY.format(user_id), delta)
+    except ValueError:
+        # Nothing cached (anymore), the next read counts the database, which
+        # already has the change.
+        pass
+
+
+def get_watch_count(user_id):
+    """The number of pages a user watches."""
+    key = WATCH_COUNT_CACHE_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = UserWatch.objects.filter(user_id=user_id).count()
+        # Don't overwrite what a concurrent request seeded and adjusted since.
+        cache.add(key, count, WATCH_COUNT_TIMEOUT)
+    return count
+
+
+def adjust_watch_count(user_id, delta):
+    """
+    Add `delta` to the user's watch count, after the watches were saved or
+    deleted, and return the new count.
+    """
+    try:
+        return cache.incr(WATCH_COUNT_CACHE_KEY.format(user_id), delta)
+    except ValueError:
+        # Nothing cached (anymore), the database already has the change.
+        return get_watch_count(user_id)
 
-def publish_bcd_notification(path, text, data=None):
-    # This traverses down the path to see if there's top level watchers
-    parts = path.split(".")
-    suffix = []
-    while len(parts) > 0:
-        subpath = ".".join(parts)
-        watcher = Watch.objects.filter(path=subpath).first()
-        suffix.append(parts.pop())
 
+def reserve_watch_count(user_id, delta):
+    """
+    Add `delta` to the user's watch count before saving the watches and
+    return the new count.
+
+    Being atomic, this reserves room for new watches so that concurrent
+    requests can't exceed the subscription limit together. Release it with
+    `adjust_watch_count(user_id, -delta)` if they don't get saved.
+    """
+    key = WATCH_COUNT_CACHE_KEY.format(user_id)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Nothing cached (anymore), the database doesn't have the change yet.
+        count = get_watch_count(user_id)
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            return count + delta
+
+
+def publish_notifications(entries):
+    """
+    Store notifications for many users in a constant number of queries.
+
+    `entries` is an iterable of `(NotificationData, user_ids)` pairs where the
+    `NotificationData` is unsaved. Identical notification data, as given by
+    its content hash, is only stored once, whether it's already in the
+    database or repeated within `entries`.
+    """
+    datas = {}
+    user_ids = defaultdict(list)
+    for notification_data, users in entries:
+        notification_data.content_hash = notification_data.compute_content_hash()
+        datas.setdefault(notification_data.content_hash, notification_data)
+        user_ids[notification_data.content_hash].extend(users)
+
+    if not datas:
+        return
+
+    NotificationData.objects.bulk_create(datas.values(), ignore_conflicts=True)
+    stored = NotificationData.objects.filter(content_hash__in=datas).values_list(
+        "content_hash", "id", "created"
+    )
+    notifications = [
+        Notification(notification_id=id, user_id=user_id, created=created)
+        for content_hash, id, created in stored
+        for user_id in user_ids[content_hash]
+    ]
+    Notification.objects.bulk_create(notifications)
+
+    for user_id, count in Counter(n.user_id for n in notifications).items():
+        adjust_unread_count(user_id, count)
+    bump_versions("notifications", {n.user_id for n in notifications})
+
+
+def bcd_notification_entries(path, text, data=None):
+    # Watchers of the path itself or of any of its parents are notified,
+    # the oldest watch for each of them.
+    watchers = {}
+    for watcher in Watch.objects.ancestors_of(path).order_by("-id"):
+        watchers[watcher.path] = watcher
+
+    parts = path.split(".")
+    for depth in range(len(parts), 0, -1):
+        watcher = watchers.get(".".join(parts[:depth]))
         if not watcher:
             continue
 
-        # Add the suffix based on the path to the title.
-        # Since suffix contains the current title (which should be an exact match)
-        # we use the suffix as title (after reversing the order).
-        title = reversed(suffix)
-        title = ".".join(title)
+        # The title is the part of the path below the watched one, including
+        # its own title (which should be an exact match).
+        title = ".".join(parts[depth - 1 :])
 
-        notification_data, _ = NotificationData.objects.get_or_create(
+        notification_data = NotificationData(
             title=title,
             text=text,
             data=data,
             type="compat",
             page_url=watcher.url,
         )
-        for user in watcher.users.all():
-            Notification.objects.create(notification=notification_data, user=user)
+        yield notification_data, watcher.users.values_list("id", flat=True)
+
+
+def publish_bcd_notification(path, text, data=None):
+    publish_notifications(bcd_notification_entries(path, text, data))
 
 
 def get_browser_info(browser, preview=False):
@@ -77,20 +223,20 @@ COPY = {
 }
 
 
-def publish_content_notification(url, text):
-    watchers = Watch.objects.filter(url=url)
+def content_notification_entries(url, text):
+    watcher = Watch.objects.for_url(url).first()
 
-    if not watchers:
+    if not watcher:
         return
 
-    notification_data, _ = NotificationData.objects.get_or_create(
-        text=text, title=watchers[0].title, type="content", page_url=url
+    notification_data = NotificationData(
+        text=text, title=watcher.title, type="content", page_url=url
     )
+    yield notification_data, watcher.users.values_list("id", flat=True)
 
-    for watcher in watchers:
-        # considering the possibility of multiple pages existing for the same path
-        for user in watcher.users.all():
-            Notification.objects.create(notification=notification_data, user=user)
+
+def publish_content_notification(url, text):
+    publish_notifications(content_notification_entries(url, text))
 
 
 def process_changes(changes):
@@ -153,8 +299,11 @@ def process_changes(changes):
                 }
             )
 
+    entries = []
     for notification in bcd_notifications:
-        publish_bcd_notification(**notification)
+        entries.extend(bcd_notification_entries(**notification))
 
     for notification in content_notifications:
-        publish_content_notification(**notification)
+        entries.extend(content_notification_entries(**notification))
+
+    publish_notifications(entries)
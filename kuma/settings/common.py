@@ -252,6 +252,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Kuma
     "kuma.core.apps.CoreConfig",
     "kuma.users.apps.UsersConfig",
@@ -322,6 +323,9 @@ OIDC_OP_JWKS_ENDPOINT = config(
     "OIDC_OP_JWKS_ENDPOINT", default="https://oauth.accounts.firefox.com/v1/jwks"
 )
 OIDC_RP_SIGN_ALGO = config("OIDC_RP_SIGN_ALGO", default="RS256")
+# How long to keep the keys from `OIDC_OP_JWKS_ENDPOINT`, in seconds. Tokens
+# signed with an unknown key make us download them sooner.
+OIDC_JWKS_CACHE_TIMEOUT = config("OIDC_JWKS_CACHE_TIMEOUT", cast=int, default=60 * 60)
 # Firefox Accounts doesn't support nonce, so don't bother sending it.
 OIDC_USE_NONCE = config("OIDC_USE_NONCE", cast=bool, default=False)
 # The default is 'openid email' but according to openid-configuration they
@@ -355,7 +359,14 @@ FXA_VERIFY_URL = config(
     "FXA_VERIFY_URL", default="https://oauth.accounts.firefox.com/v1/verify"
 )
 # Set token re-check time to an hour in seconds
-FXA_TOKEN_EXPIRY = config("FXA_TOKEN_EXPIRY", default=43200)
+FXA_TOKEN_EXPIRY = config("FXA_TOKEN_EXPIRY", cast=int, default=43200)
+# Refresh access tokens in the background when they expire within this many
+# seconds.
+FXA_TOKEN_REFRESH_AHEAD = config("FXA_TOKEN_REFRESH_AHEAD", cast=int, default=60 * 10)
+# How many rows to delete at once when deleting a user's data.
+USER_DELETION_CHUNK_SIZE = config("USER_DELETION_CHUNK_SIZE", cast=int, default=1000)
+# How many pending account events to process at once.
+ACCOUNT_EVENT_BATCH_SIZE = config("ACCOUNT_EVENT_BATCH_SIZE", cast=int, default=500)
 FXA_SET_ISSUER = config("FXA_SET_ISSUER", default="https://accounts.firefox.com")
 FXA_SET_ID_PREFIX = config(
     "FXA_SET_ID_PREFIX", default="https://schemas.accounts.firefox.com/event/"
@@ -373,6 +384,13 @@ SESSION_COOKIE_DOMAIN = DOMAIN
 SESSION_COOKIE_SECURE = config("SESSION_COOKIE_SECURE", default=True, cast=bool)
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_AGE = config("SESSION_COOKIE_AGE", default=60 * 60 * 24 * 365, cast=int)
+# Sessions are read from the cache and only written through to the database,
+# which keeps them when the cache is flushed. Any other session engine, e.g.
+# "django.contrib.sessions.backends.signed_cookies" to not store them at all,
+# can be used instead.
+SESSION_ENGINE = config(
+    "SESSION_ENGINE", default="django.contrib.sessions.backends.cached_db"
+)
 
 # bug 856061
 ALLOWED_HOSTS = config(
@@ -446,6 +464,7 @@ CELERY_EVENT_SERIALIZER = "pickle"
 
 CELERY_TASK_ROUTES = {
     "kuma.core.tasks.clean_sessions": {"queue": "mdn_purgeable"},
+    "kuma.core.tasks.clear_old_notifications": {"queue": "mdn_purgeable"},
 }
 
 # Do not change this without also deleting all wiki documents:
@@ -457,6 +476,11 @@ SESSION_CLEANUP_CHUNK_SIZE = config(
     "SESSION_CLEANUP_CHUNK_SIZE", default=1000, cast=int
 )
 
+# Number of old or deleted notifications to delete in one transaction.
+NOTIFICATIONS_CLEANUP_CHUNK_SIZE = config(
+    "NOTIFICATIONS_CLEANUP_CHUNK_SIZE", default=1000, cast=int
+)
+
 # Email address from which welcome emails will be sent
 WELCOME_EMAIL_FROM = config(
     "WELCOME_EMAIL_FROM",
@@ -570,6 +594,26 @@ SEARCH_INDEX_NAME = config("SEARCH_INDEX_NAME", default="mdn_docs")
 BOOKMARKS_BASE_URL = config(
     "BOOKMARKS_BASE_URL", default="https://developer.mozilla.org"
 )
+# Locales whose search index is used to know the titles of documents before
+# their `index.json` is downloaded.
+DOCUMENTURL_PRELOAD_LOCALES = config(
+    "DOCUMENTURL_PRELOAD_LOCALES", default="en-US", cast=Csv()
+)
+# Revalidating DocumentURLs: how many per run, how long before each is
+# checked again (in seconds), and how many requests at a time in total and
+# per host.
+DOCUMENTURL_REVALIDATION_BATCH_SIZE = config(
+    "DOCUMENTURL_REVALIDATION_BATCH_SIZE", default=500, cast=int
+)
+DOCUMENTURL_REVALIDATION_INTERVAL = config(
+    "DOCUMENTURL_REVALIDATION_INTERVAL", default=60 * 60 * 24, cast=int
+)
+DOCUMENTURL_REVALIDATION_CONCURRENCY = config(
+    "DOCUMENTURL_REVALIDATION_CONCURRENCY", default=8, cast=int
+)
+DOCUMENTURL_REVALIDATION_HOST_CONCURRENCY = config(
+    "DOCUMENTURL_REVALIDATION_HOST_CONCURRENCY", default=4, cast=int
+)
 API_V1_BOOKMARKS_PAGE_SIZE = config("API_V1_BOOKMARKS_PAGE_SIZE", cast=int, default=20)
 API_V1_PAGE_SIZE = config("API_V1_PAGE_SIZE", cast=int, default=20)
 
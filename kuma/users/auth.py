@@ -3,10 +3,14 @@ import time
 import requests
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils.encoding import smart_str
+from josepy.jws import JWS, Header
 from mozilla_django_oidc.auth import OIDCAuthenticationBackend
 
-from kuma.users.utils import get_valid_subscription_type_or_none
+from kuma.core.utils import save_changes
+from kuma.users.utils import get_valid_subscription_type_or_none, is_pending_deletion
 
+from .jwks import jwks
 from .models import UserProfile
 
 
@@ -17,6 +21,11 @@ class KumaOIDCAuthenticationBackend(OIDCAuthenticationBackend):
         super().__init__(*args, **kwargs)
         self.refresh_token = None
 
+    def retrieve_matching_jwk(self, token):
+        """Get the signing key from the (cached) JWKS of the OP."""
+        header = Header.json_loads(JWS.from_compact(token).signature.protected)
+        return jwks.get_matching_jwk(smart_str(header.kid), smart_str(header.alg))
+
     def get_token(self, payload):
         """Override get_token to extract the refresh token."""
         token_info = super().get_token(payload)
@@ -90,30 +99,32 @@ class KumaOIDCAuthenticationBackend(OIDCAuthenticationBackend):
         except get_user_model().DoesNotExist:
             user = get_user_model().objects.create_user(email=email, username=fxa_uid)
 
-        # update the email if needed
-        if email and user.email != email:
-            user.email = email
-        # toggle user status based on subscriptions
-        user.is_active = True
-        user.save()
-
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-        if avatar := claims.get("avatar"):
-            profile.avatar = avatar
-
-        profile.is_subscriber = settings.MDN_PLUS_SUBSCRIPTION in claims.get(
-            "subscriptions", []
-        ) or settings.MDN_PLUS_SUBSCRIPTION == claims.get("fxa-subscriptions", "")
-
-        profile.subscription_type = get_valid_subscription_type_or_none(
-            claims.get("subscriptions", [])
+        # update the email if needed and toggle user status based on subscriptions,
+        # but users being deleted stay disabled
+        save_changes(
+            user,
+            email=email or user.email,
+            is_active=user.is_active or not is_pending_deletion(user.id),
         )
 
+        profile, _ = UserProfile.objects.get_or_create(user=user)
         if user.is_staff:
-            profile.is_subscriber = True
-            profile.subscription_type = UserProfile.SubscriptionType.MDN_PLUS_10Y
-
-        profile.save()
+            is_subscriber = True
+            subscription_type = UserProfile.SubscriptionType.MDN_PLUS_10Y
+        else:
+            is_subscriber = settings.MDN_PLUS_SUBSCRIPTION in claims.get(
+                "subscriptions", []
+            ) or settings.MDN_PLUS_SUBSCRIPTION == claims.get("fxa-subscriptions", "")
+            subscription_type = get_valid_subscription_type_or_none(
+                claims.get("subscriptions", [])
+            )
+        save_changes(
+            profile,
+            avatar=claims.get("avatar") or profile.avatar,
+            is_subscriber=is_subscriber,
+            subscription_type=subscription_type,
+        )
+        user.userprofile = profile
 
         return user
 
@@ -122,9 +133,7 @@ class KumaOIDCAuthenticationBackend(OIDCAuthenticationBackend):
         user = self.create_or_update_subscriber(claims, user)
 
         if self.refresh_token:
-            UserProfile.objects.filter(user=user).update(
-                fxa_refresh_token=self.refresh_token
-            )
+            save_changes(user.userprofile, fxa_refresh_token=self.refresh_token)
 
 
 def logout_url(request):
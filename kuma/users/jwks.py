@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousOperation
+
+log = logging.getLogger("kuma.users.jwks")
+
+JWKS_CACHE_KEY = "users:jwks"
+JWKS_LOCK_KEY = "users:jwks:lock"
+JWKS_LOCK_EXPIRE = 30
+JWKS_REQUEST_TIMEOUT = 10
+# How long to wait for another process to refresh the keys.
+JWKS_LOCK_WAIT = 5
+# Tokens with an unknown `kid` only trigger a refresh this often, so that
+# made-up ones can't make us hammer the JWKS endpoint.
+JWKS_MIN_REFRESH_INTERVAL = 60
+
+
+class JWKSCache:
+    """
+    The JSON Web Keys of the OIDC provider, kept in the process and shared
+    with the other processes through the cache.
+
+    Only one thread per process, and ideally only one process, downloads the
+    keys when they expire or get rotated, while the others wait for its
+    result.
+    """
+
+    def __init__(self):
+        self.keys = None
+        self.fetched = 0
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.keys = None
+            self.fetched = 0
+
+    def is_fresh(self, fetched):
+        return fetched + settings.OIDC_JWKS_CACHE_TIMEOUT > time.time()
+
+    def get_keys(self):
+        if self.keys is not None and self.is_fresh(self.fetched):
+            return self.keys
+        if (shared := cache.get(JWKS_CACHE_KEY)) and self.is_fresh(shared["fetched"]):
+            self.keys, self.fetched = shared["keys"], shared["fetched"]
+            return self.keys
+        return self.refresh(since=self.fetched)
+
+    def refresh(self, since):
+        """
+        Download the keys, unless somebody else did since `since`, i.e. while
+        we were waiting for the lock.
+        """
+        with self.lock:
+            if self.fetched > since:
+                return self.keys
+            shared = self.fetch_single_flight(since)
+            self.keys, self.fetched = shared["keys"], shared["fetched"]
+            return self.keys
+
+    def fetch_single_flight(self, since):
+        shared = cache.get(JWKS_CACHE_KEY)
+        if shared and shared["fetched"] > since and self.is_fresh(shared["fetched"]):
+            return shared
+        if cache.add(JWKS_LOCK_KEY, True, JWKS_LOCK_EXPIRE):
+            try:
+                return self.fetch()
+            finally:
+                cache.delete(JWKS_LOCK_KEY)
+
+        # Another process is downloading them, wait for its result.
+        deadline = time.monotonic() + JWKS_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            shared = cache.get(JWKS_CACHE_KEY)
+            if shared and shared["fetched"] > since:
+                return shared
+        log.warning("Timed out waiting for the JWKS, downloading them anyway")
+        return self.fetch()
+
+    def fetch(self):
+        response = requests.get(
+            settings.OIDC_OP_JWKS_ENDPOINT, timeout=JWKS_REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        shared = {"keys": response.json()["keys"], "fetched": time.time()}
+        cache.set(JWKS_CACHE_KEY, shared, settings.OIDC_JWKS_CACHE_TIMEOUT)
+        return shared
+
+    def get_matching_jwk(self, kid, alg):
+        """
+        Get the key a token was signed with, downloading the keys again if it
+        isn't known (yet), e.g. because the provider rotated them.
+        """
+        fetched = self.fetched
+        if jwk := find_jwk(self.get_keys(), kid, alg):
+            return jwk
+        if self.fetched + JWKS_MIN_REFRESH_INTERVAL < time.time():
+            if jwk := find_jwk(self.refresh(since=fetched), kid, alg):
+                return jwk
+        raise SuspiciousOperation("Could not find a valid JWKS.")
+
+
+def find_jwk(keys, kid, alg):
+    for jwk in keys:
+        if jwk["kid"] != kid:
+            continue
+        if "alg" in jwk and jwk["alg"] != alg:
+            raise SuspiciousOperation("alg values do not match.")
+        return jwk
+    return None
+
+
+jwks = JWKSCache()
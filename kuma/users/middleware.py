@@ -2,10 +2,12 @@ import time
 
 from django.conf import settings
 from django.contrib.auth import logout
+from django.core.cache import cache
 from django.core.exceptions import MiddlewareNotUsed
 from mozilla_django_oidc.middleware import SessionRefresh
 
 from kuma.users.auth import KumaOIDCAuthenticationBackend
+from kuma.users.tasks import ACCESS_TOKEN_CACHE_KEY, schedule_access_token_refresh
 
 
 class ValidateAccessTokenMiddleware(SessionRefresh):
@@ -13,6 +15,9 @@ class ValidateAccessTokenMiddleware(SessionRefresh):
 
     Verify that the access token has not been invalidated
     by the user through the Firefox Accounts web interface.
+
+    Tokens are refreshed in the background shortly before they expire, and
+    only refreshed during the request when that didn't happen in time.
     """
 
     def __init__(self, *args, **kwargs):
@@ -21,27 +26,38 @@ class ValidateAccessTokenMiddleware(SessionRefresh):
         super().__init__(*args, **kwargs)
 
     def process_request(self, request):
+        access_token = request.session.get("oidc_access_token")
+        expiration = request.session.get("oidc_id_token_expiration", 0)
+        now = time.time()
 
+        # Nothing to do until the token is about to expire.
+        if not access_token or expiration - now > settings.FXA_TOKEN_REFRESH_AHEAD:
+            return
         if not self.is_refreshable_url(request):
             return
 
-        expiration = request.session.get("oidc_id_token_expiration", 0)
-        now = time.time()
-        access_token = request.session.get("oidc_access_token")
-        profile = request.user.userprofile
+        refreshed = cache.get(ACCESS_TOKEN_CACHE_KEY.format(request.user.id))
+        if refreshed and refreshed["expiration"] > expiration:
+            request.session["oidc_access_token"] = refreshed["access_token"]
+            request.session["oidc_id_token_expiration"] = refreshed["expiration"]
+            return
 
-        if access_token and expiration < now:
+        if expiration >= now:
+            schedule_access_token_refresh(request.user.id)
+            return
 
-            token_info = KumaOIDCAuthenticationBackend.refresh_access_token(
-                profile.fxa_refresh_token
+        # It expired before it could be refreshed in the background.
+        profile = request.user.userprofile
+        token_info = KumaOIDCAuthenticationBackend.refresh_access_token(
+            profile.fxa_refresh_token
+        )
+        new_access_token = token_info.get("access_token")
+        if new_access_token:
+            request.session["oidc_access_token"] = new_access_token
+            request.session["oidc_id_token_expiration"] = (
+                now + settings.FXA_TOKEN_EXPIRY
             )
-            new_access_token = token_info.get("access_token")
-            if new_access_token:
-                request.session["oidc_access_token"] = new_access_token
-                request.session["oidc_id_token_expiration"] = (
-                    now + settings.FXA_TOKEN_EXPIRY
-                )
-            else:
-                profile.fxa_refresh_token = ""
-                profile.save()
-                logout(request)
+        else:
+            profile.fxa_refresh_token = ""
+            profile.save()
+            logout(request)
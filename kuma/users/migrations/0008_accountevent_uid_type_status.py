@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-19 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_userprofile_subscription_type"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="accountevent",
+            index=models.Index(
+                fields=["fxa_uid", "event_type", "status"],
+                name="accountevent_uid_type_status",
+            ),
+        ),
+    ]
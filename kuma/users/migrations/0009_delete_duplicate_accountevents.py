@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def delete_duplicate_accountevents(apps, schema_editor):
+    AccountEvent = apps.get_model("users", "AccountEvent")
+    duplicates = (
+        AccountEvent.objects.exclude(jwt_id="")
+        .values("jwt_id", "event_type")
+        .annotate(count=Count("id"), keep=Min("id"))
+        .filter(count__gt=1)
+        .values_list("jwt_id", "event_type", "keep")
+    )
+    for jwt_id, event_type, keep in duplicates.iterator():
+        AccountEvent.objects.filter(jwt_id=jwt_id, event_type=event_type).exclude(
+            id=keep
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_accountevent_uid_type_status"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=delete_duplicate_accountevents,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
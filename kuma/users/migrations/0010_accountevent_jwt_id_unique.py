@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-19 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0009_delete_duplicate_accountevents"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="accountevent",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("jwt_id", ""), _negated=True),
+                fields=("jwt_id", "event_type"),
+                name="accountevent_jwt_id_unique",
+            ),
+        ),
+    ]
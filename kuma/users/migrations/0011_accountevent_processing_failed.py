@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-19 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0010_accountevent_jwt_id_unique"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="accountevent",
+            name="status",
+            field=models.IntegerField(
+                choices=[
+                    (1, "Processed"),
+                    (2, "Pending"),
+                    (3, "Ignored"),
+                    (4, "Not Implemented"),
+                    (5, "Processing"),
+                    (6, "Failed"),
+                ],
+                default=2,
+            ),
+        ),
+    ]
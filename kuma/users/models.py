@@ -1,7 +1,14 @@
 import json
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+# The profile fields `whoami` needs, cached per user.
+PROFILE_CACHE_KEY = "users:profile:{}"
+PROFILE_CACHE_TIMEOUT = 60 * 60 * 24
 
 
 class UserProfile(models.Model):
@@ -43,6 +50,22 @@ class UserProfile(models.Model):
         )
 
 
+class UserDeletion(models.Model):
+    """A user who is to be deleted, which is forgotten along with the user."""
+
+    user = models.OneToOneField(get_user_model(), on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Deletion of user {self.user_id}"
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def forget_cached_profile(sender, instance, **kwargs):
+    cache.delete(PROFILE_CACHE_KEY.format(instance.user_id))
+
+
 class AccountEvent(models.Model):
     """Stores the Events received from Firefox Accounts.
 
@@ -64,6 +87,9 @@ class AccountEvent(models.Model):
         PENDING = 2
         IGNORED = 3
         NOT_IMPLEMENTED = 4
+        # Claimed by a run of `process_pending_events`.
+        PROCESSING = 5
+        FAILED = 6
 
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
@@ -79,3 +105,18 @@ class AccountEvent(models.Model):
 
     class Meta:
         ordering = ["-modified_at"]
+        indexes = [
+            models.Index(
+                fields=["fxa_uid", "event_type", "status"],
+                name="accountevent_uid_type_status",
+            )
+        ]
+        constraints = [
+            # FxA retries webhooks, and every event of a token is only stored
+            # once.
+            models.UniqueConstraint(
+                fields=["jwt_id", "event_type"],
+                condition=~models.Q(jwt_id=""),
+                name="accountevent_jwt_id_unique",
+            )
+        ]
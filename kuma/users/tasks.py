@@ -1,12 +1,39 @@
 import json
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
 
 from celery import task
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
 
+from kuma.core.utils import delete_in_batches, save_changes
 from kuma.users.auth import KumaOIDCAuthenticationBackend
-from kuma.users.models import AccountEvent, UserProfile
+from kuma.users.models import AccountEvent, UserDeletion, UserProfile
 from kuma.users.utils import get_valid_subscription_type_or_none
 
+log = logging.getLogger("kuma.users.tasks")
+
+USER_DELETION_PROGRESS_KEY = "users:deletion:{}"
+USER_DELETION_PROGRESS_TIMEOUT = 60 * 60 * 24
+# Deletions that didn't finish after this long (in seconds), e.g. because the
+# task failed, are started again.
+USER_DELETION_RETRY_AFTER = 60 * 60
+
+# Access tokens refreshed in the background, for the middleware to pick up.
+ACCESS_TOKEN_CACHE_KEY = "users:access-token:{}"
+ACCESS_TOKEN_LOCK_KEY = "users:access-token:{}:lock"
+ACCESS_TOKEN_LOCK_EXPIRE = 60
+# Claimed account events that aren't processed after this long (in seconds),
+# e.g. because the worker died, are claimed again. Runs renew their claim
+# while they are busy.
+ACCOUNT_EVENT_CLAIM_TIMEOUT = 60 * 10
+
 
 @task
 def process_event_delete_user(event_id):
@@ -16,7 +43,7 @@ def process_event_delete_user(event_id):
     except get_user_model().DoesNotExist:
         return
 
-    user.delete()
+    schedule_user_deletion(user)
 
     event.status = AccountEvent.PROCESSED
     event.save()
@@ -46,17 +73,7 @@ def process_event_subscription_state_change(event_id):
             event.save()
             return
 
-    subscription_type = get_valid_subscription_type_or_none(
-        payload.get("capabilities", [])
-    )
-    if not user.is_staff:
-        if payload["isActive"]:
-            profile.subscription_type = subscription_type
-            profile.is_subscriber = True
-        else:
-            profile.subscription_type = ""
-            profile.is_subscriber = False
-        profile.save()
+    apply_subscription_state(user, profile, payload)
 
     event.status = AccountEvent.EventStatus.PROCESSED
     event.save()
@@ -78,12 +95,16 @@ def process_event_profile_change(event_id):
     except get_user_model().DoesNotExist:
         return
 
+    event.status = update_profile_from_fxa(user, profile)
+    event.save()
+
+
+def update_profile_from_fxa(user, profile):
+    """Update a user with their current FxA profile, returning the status."""
     refresh_token = profile.fxa_refresh_token
 
     if not refresh_token:
-        event.status = AccountEvent.IGNORED
-        event.save()
-        return
+        return AccountEvent.EventStatus.IGNORED
 
     fxa = KumaOIDCAuthenticationBackend()
     token_info = fxa.get_token(
@@ -98,6 +119,288 @@ def process_event_profile_change(event_id):
     access_token = token_info.get("access_token")
     user_info = fxa.get_userinfo(access_token, None, None)
     fxa.update_user(user, user_info)
+    return AccountEvent.EventStatus.PROCESSED
 
-    event.status = AccountEvent.EventStatus.PROCESSED
-    event.save()
+
+@task
+def refresh_access_token(user_id):
+    """
+    Get a new access token for a user whose token is about to expire, and
+    leave it in the cache for `ValidateAccessTokenMiddleware`.
+    """
+    profile = UserProfile.objects.filter(user_id=user_id).first()
+    if not profile or not profile.fxa_refresh_token:
+        return
+    token_info = KumaOIDCAuthenticationBackend.refresh_access_token(
+        profile.fxa_refresh_token
+    )
+    # When the refresh token doesn't work (anymore), the middleware logs the
+    # user out once the current access token expires.
+    if access_token := token_info.get("access_token"):
+        cache.set(
+            ACCESS_TOKEN_CACHE_KEY.format(user_id),
+            {
+                "access_token": access_token,
+                "expiration": time.time() + settings.FXA_TOKEN_EXPIRY,
+            },
+            settings.FXA_TOKEN_EXPIRY,
+        )
+
+
+def schedule_access_token_refresh(user_id):
+    """Refresh a user's access token in the background, once at a time."""
+    if cache.add(ACCESS_TOKEN_LOCK_KEY.format(user_id), True, ACCESS_TOKEN_LOCK_EXPIRE):
+        refresh_access_token.delay(user_id)
+
+
+def apply_subscription_state(user, profile, payload):
+    if user.is_staff:
+        return
+    if payload["isActive"]:
+        save_changes(
+            profile,
+            subscription_type=get_valid_subscription_type_or_none(
+                payload.get("capabilities", [])
+            ),
+            is_subscriber=True,
+        )
+    else:
+        save_changes(profile, subscription_type="", is_subscriber=False)
+
+
+@task
+def process_pending_events():
+    """
+    Process the pending account events in batches, coalescing the events of
+    every user: only their latest subscription state is applied and their
+    profile is updated once, however many events there are.
+
+    Concurrent runs skip the events another run claimed.
+    """
+    while process_pending_event_batch():
+        pass
+
+
+def process_pending_event_batch():
+    """Process a batch of pending events, returning how many there were."""
+    events = claim_pending_events()
+    if not events:
+        return 0
+
+    events_by_uid = defaultdict(list)
+    for event in events:
+        events_by_uid[event.fxa_uid].append(event)
+    users = {
+        user.username: user
+        for user in get_user_model()
+        .objects.filter(username__in=events_by_uid)
+        .select_related("userprofile")
+    }
+    # The latest subscription change that was already applied, per user.
+    last_change_times = {
+        event.fxa_uid: json.loads(event.payload).get("changeTime")
+        for event in AccountEvent.objects.filter(
+            fxa_uid__in=events_by_uid,
+            event_type=AccountEvent.EventType.SUBSCRIPTION_CHANGED,
+            status=AccountEvent.EventStatus.PROCESSED,
+        )
+        .order_by("fxa_uid", "-modified_at")
+        .distinct("fxa_uid")
+    }
+
+    claimed = time.monotonic()
+    unprocessed = {event.id for event in events}
+    for fxa_uid, user_events in events_by_uid.items():
+        if time.monotonic() - claimed > ACCOUNT_EVENT_CLAIM_TIMEOUT / 2:
+            # Renew the claim on the events left, for slow batches not to be
+            # taken over by another run.
+            AccountEvent.objects.filter(
+                id__in=unprocessed, status=AccountEvent.EventStatus.PROCESSING
+            ).update(modified_at=timezone.now())
+            claimed = time.monotonic()
+        process_user_events(
+            users.get(fxa_uid), user_events, last_change_times.get(fxa_uid)
+        )
+        unprocessed.difference_update(event.id for event in user_events)
+    return len(events)
+
+
+def claim_pending_events():
+    """
+    Claim a batch of pending events, or of events claimed by a run that
+    didn't finish them, locking them only for as long as that takes.
+    """
+    abandoned = timezone.now() - timedelta(seconds=ACCOUNT_EVENT_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        events = list(
+            AccountEvent.objects.filter(
+                Q(status=AccountEvent.EventStatus.PENDING)
+                | Q(
+                    status=AccountEvent.EventStatus.PROCESSING,
+                    modified_at__lt=abandoned,
+                )
+            )
+            .order_by("id")
+            .select_for_update(skip_locked=True)[: settings.ACCOUNT_EVENT_BATCH_SIZE]
+        )
+        set_event_statuses(
+            {event.id: AccountEvent.EventStatus.PROCESSING for event in events}
+        )
+    return events
+
+
+def set_event_statuses(statuses):
+    """Store the new status of events by id, in one query per status."""
+    ids_by_status = defaultdict(list)
+    for event_id, status in statuses.items():
+        ids_by_status[status].append(event_id)
+    for status, ids in ids_by_status.items():
+        AccountEvent.objects.filter(id__in=ids).update(
+            status=status, modified_at=timezone.now()
+        )
+
+
+def process_user_events(user, events, last_change_time):
+    """
+    Act upon the claimed events of one user and store their new statuses.
+
+    Their changes are committed together, but for the update of their
+    profile, which asks FxA for it and so happens outside of any transaction.
+    Events that fail to be processed are marked as such, without affecting
+    the events of other users.
+    """
+    try:
+        with transaction.atomic():
+            statuses, profile_changes = apply_user_events(
+                user, events, last_change_time
+            )
+            set_event_statuses(statuses)
+    except Exception:
+        log.exception("Failed to process the account events of %s" % user)
+        set_event_statuses(
+            dict.fromkeys(
+                (event.id for event in events), AccountEvent.EventStatus.FAILED
+            )
+        )
+        return
+
+    if profile_changes:
+        try:
+            status = update_profile_from_fxa(user, user.userprofile)
+        except Exception:
+            log.exception("Failed to update the profile of %s from FxA" % user)
+            status = AccountEvent.EventStatus.FAILED
+        set_event_statuses(
+            dict.fromkeys((event.id for event in profile_changes), status)
+        )
+
+
+def apply_user_events(user, events, last_change_time):
+    """
+    Apply the events of one user that only need the database, returning the
+    new status of each event by id and the profile changes left to apply.
+    """
+    statuses = {}
+    by_type = defaultdict(list)
+    for event in events:
+        by_type[event.event_type].append(event)
+        # Whatever isn't handled below is ignored.
+        statuses[event.id] = AccountEvent.EventStatus.IGNORED
+
+    if user is None:
+        return statuses, []
+
+    if deleted := by_type[AccountEvent.EventType.PROFILE_DELETED]:
+        schedule_user_deletion(user)
+        for event in deleted:
+            statuses[event.id] = AccountEvent.EventStatus.PROCESSED
+        return statuses, []
+
+    for event in by_type[AccountEvent.EventType.PASSWORD_CHANGED]:
+        statuses[event.id] = AccountEvent.EventStatus.PROCESSED
+
+    profile = getattr(user, "userprofile", None)
+    if profile is None:
+        return statuses, []
+
+    if subscription_changes := by_type[AccountEvent.EventType.SUBSCRIPTION_CHANGED]:
+        payloads = {
+            event.id: json.loads(event.payload) for event in subscription_changes
+        }
+        latest = max(
+            subscription_changes,
+            key=lambda event: (payloads[event.id].get("changeTime") or 0, event.id),
+        )
+        change_time = payloads[latest.id].get("changeTime")
+        if not (last_change_time and change_time and last_change_time >= change_time):
+            apply_subscription_state(user, profile, payloads[latest.id])
+            statuses[latest.id] = AccountEvent.EventStatus.PROCESSED
+
+    return statuses, by_type[AccountEvent.EventType.PROFILE_CHANGED]
+
+
+def schedule_user_deletion(user):
+    """
+    Disable a user right away, and delete them and their data in the
+    background.
+
+    Until then, signing in again doesn't enable them, see
+    `is_pending_deletion`, and `delete_pending_users` finishes deletions
+    that failed.
+    """
+    with transaction.atomic():
+        UserDeletion.objects.get_or_create(user=user)
+        save_changes(user, is_active=False)
+        transaction.on_commit(lambda: delete_user.delay(user.id))
+
+
+@task
+def delete_user(user_id):
+    """
+    Delete a user, first deleting what belongs to them in batches, so that
+    even users with lots of data never need much memory or long locks.
+
+    The progress is kept in the cache, per model.
+    """
+    user_model = get_user_model()
+    progress_key = USER_DELETION_PROGRESS_KEY.format(user_id)
+    progress = {}
+    for relation in user_model._meta.related_objects:
+        if relation.many_to_many or relation.on_delete is not models.CASCADE:
+            continue
+        if relation.related_model is UserDeletion:
+            # Only forgotten along with the user, once everything else is gone.
+            continue
+        label = relation.related_model._meta.label_lower
+        queryset = relation.related_model._base_manager.filter(
+            **{relation.field.name: user_id}
+        )
+        progress[label] = 0
+        for _, deleted, elapsed in delete_in_batches(
+            queryset, settings.USER_DELETION_CHUNK_SIZE
+        ):
+            progress[label] += deleted
+            cache.set(progress_key, progress, USER_DELETION_PROGRESS_TIMEOUT)
+            log.info(
+                "Deleted %s %s rows of user %s in %.3fs"
+                % (deleted, label, user_id, elapsed)
+            )
+
+    user_model.objects.filter(id=user_id).delete()
+    progress["done"] = True
+    cache.set(progress_key, progress, USER_DELETION_PROGRESS_TIMEOUT)
+    log.info("Deleted user %s: %s" % (user_id, progress))
+    return progress
+
+
+@task
+def delete_pending_users():
+    """
+    Delete the users whose deletion didn't finish, e.g. because the task
+    failed or was lost, picking up where it stopped.
+    """
+    started_before = timezone.now() - timedelta(seconds=USER_DELETION_RETRY_AFTER)
+    for user_id in UserDeletion.objects.filter(created__lt=started_before).values_list(
+        "user_id", flat=True
+    ):
+        delete_user.delay(user_id)
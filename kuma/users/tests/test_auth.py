@@ -1,6 +1,12 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
 from django.test import RequestFactory
 
-from kuma.users.auth import logout_url
+from kuma.users.auth import KumaOIDCAuthenticationBackend, logout_url
+from kuma.users.models import UserProfile
+from kuma.users.tasks import delete_user, schedule_user_deletion
 
 
 # TODO: Check which new tests are needed.
@@ -24,3 +30,51 @@ def test_logout_url(settings):
     request.session["oidc_login_next"] = "/original"
     url = logout_url(request)
     assert url == "/original"
+
+
+@pytest.mark.django_db
+def test_create_or_update_subscriber_only_writes_changes(
+    settings, django_assert_num_queries
+):
+    claims = {
+        "sub": "fxa-uid",
+        "email": "fxa@example.com",
+        "avatar": "https://example.com/avatar.png",
+        "subscriptions": [settings.MDN_PLUS_SUBSCRIPTION, "mdn_plus_5m"],
+    }
+    user = KumaOIDCAuthenticationBackend.create_or_update_subscriber(claims)
+    profile = UserProfile.objects.get(user=user)
+    assert profile.is_subscriber
+    assert profile.subscription_type == "mdn_plus_5m"
+
+    # Reading the user and the profile, and nothing to save.
+    with django_assert_num_queries(2):
+        KumaOIDCAuthenticationBackend.create_or_update_subscriber(claims)
+
+    claims["email"] = "new@example.com"
+    claims["subscriptions"] = []
+    with django_assert_num_queries(4):
+        user = KumaOIDCAuthenticationBackend.create_or_update_subscriber(claims)
+    assert user.email == "new@example.com"
+    profile.refresh_from_db()
+    assert not profile.is_subscriber
+    assert profile.subscription_type == ""
+    assert profile.avatar == "https://example.com/avatar.png"
+
+
+@pytest.mark.django_db
+def test_create_or_update_subscriber_keeps_deleted_users_disabled(wiki_user):
+    claims = {"sub": wiki_user.username, "email": wiki_user.email}
+    wiki_user.is_active = False
+    wiki_user.save()
+    user = KumaOIDCAuthenticationBackend.create_or_update_subscriber(claims)
+    assert user.is_active
+
+    with mock.patch.object(delete_user, "delay"):
+        schedule_user_deletion(user)
+    # Which is remembered in the database, not just the cache.
+    cache.clear()
+    user = KumaOIDCAuthenticationBackend.create_or_update_subscriber(claims)
+    assert not user.is_active
+    wiki_user.refresh_from_db()
+    assert not wiki_user.is_active
@@ -0,0 +1,58 @@
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousOperation
+
+from kuma.users.jwks import JWKS_CACHE_KEY, JWKS_MIN_REFRESH_INTERVAL, jwks
+
+KEY_1 = {"kid": "key-1", "alg": "RS256", "kty": "RSA", "n": "abc", "e": "AQAB"}
+KEY_2 = {"kid": "key-2", "alg": "RS256", "kty": "RSA", "n": "def", "e": "AQAB"}
+
+
+def age_keys(seconds):
+    """Pretend the keys were downloaded `seconds` earlier."""
+    jwks.fetched -= seconds
+    shared = cache.get(JWKS_CACHE_KEY)
+    shared["fetched"] -= seconds
+    cache.set(JWKS_CACHE_KEY, shared)
+
+
+@pytest.fixture
+def jwks_endpoint(mock_requests, settings):
+    return mock_requests.get(settings.OIDC_OP_JWKS_ENDPOINT, json={"keys": [KEY_1]})
+
+
+def test_keys_are_cached(jwks_endpoint):
+    assert jwks.get_matching_jwk("key-1", "RS256") == KEY_1
+    assert jwks.get_matching_jwk("key-1", "RS256") == KEY_1
+    assert jwks_endpoint.call_count == 1
+
+    # Other processes use the keys from the shared cache.
+    jwks.keys = None
+    assert jwks.get_matching_jwk("key-1", "RS256") == KEY_1
+    assert jwks_endpoint.call_count == 1
+
+
+def test_keys_expire(jwks_endpoint, settings):
+    jwks.get_matching_jwk("key-1", "RS256")
+    age_keys(settings.OIDC_JWKS_CACHE_TIMEOUT + 1)
+    jwks.get_matching_jwk("key-1", "RS256")
+    assert jwks_endpoint.call_count == 2
+
+
+def test_unknown_kid_refreshes_keys(jwks_endpoint, mock_requests, settings):
+    jwks.get_matching_jwk("key-1", "RS256")
+    age_keys(JWKS_MIN_REFRESH_INTERVAL + 1)
+
+    mock_requests.get(settings.OIDC_OP_JWKS_ENDPOINT, json={"keys": [KEY_1, KEY_2]})
+    assert jwks.get_matching_jwk("key-2", "RS256") == KEY_2
+    assert mock_requests.call_count == 2
+
+    # Keys that still aren't known don't trigger another refresh right away.
+    with pytest.raises(SuspiciousOperation):
+        jwks.get_matching_jwk("key-3", "RS256")
+    assert mock_requests.call_count == 2
+
+
+def test_alg_mismatch(jwks_endpoint):
+    with pytest.raises(SuspiciousOperation):
+        jwks.get_matching_jwk("key-1", "ES256")
@@ -0,0 +1,81 @@
+import time
+from unittest import mock
+
+import pytest
+from django.contrib.sessions.backends.cache import SessionStore
+from django.test import RequestFactory
+
+from kuma.users.middleware import ValidateAccessTokenMiddleware
+from kuma.users.models import UserProfile
+from kuma.users.tasks import refresh_access_token
+
+
+@pytest.fixture
+def middleware(settings):
+    settings.DEV = False
+    return ValidateAccessTokenMiddleware(lambda request: None)
+
+
+@pytest.fixture
+def profile(wiki_user):
+    return UserProfile.objects.create(user=wiki_user, fxa_refresh_token="refresh")
+
+
+def make_request(user, expires_in):
+    request = RequestFactory().get("/en-US/plus")
+    request.user = user
+    request.session = SessionStore()
+    request.session["oidc_access_token"] = "old"
+    request.session["oidc_id_token_expiration"] = time.time() + expires_in
+    return request
+
+
+@pytest.mark.django_db
+def test_valid_token_is_left_alone(
+    middleware, profile, wiki_user, django_assert_num_queries
+):
+    request = make_request(wiki_user, expires_in=60 * 60)
+    with mock.patch.object(refresh_access_token, "delay") as delay:
+        with django_assert_num_queries(0):
+            middleware.process_request(request)
+    delay.assert_not_called()
+    assert request.session["oidc_access_token"] == "old"
+
+
+@pytest.mark.django_db
+def test_expiring_token_is_refreshed_once(middleware, profile, wiki_user):
+    with mock.patch.object(refresh_access_token, "delay") as delay:
+        for _ in range(3):
+            request = make_request(wiki_user, expires_in=60)
+            middleware.process_request(request)
+            assert request.session["oidc_access_token"] == "old"
+    delay.assert_called_once_with(wiki_user.id)
+
+
+@pytest.mark.django_db
+def test_expiring_token_is_refreshed_in_the_background(middleware, profile, wiki_user):
+    with mock.patch(
+        "kuma.users.auth.KumaOIDCAuthenticationBackend.refresh_access_token",
+        return_value={"access_token": "new"},
+    ) as refresh:
+        request = make_request(wiki_user, expires_in=60)
+        middleware.process_request(request)
+        assert request.session["oidc_access_token"] == "old"
+
+        # The next request picks up the new token.
+        request = make_request(wiki_user, expires_in=60)
+        middleware.process_request(request)
+        assert request.session["oidc_access_token"] == "new"
+        assert request.session["oidc_id_token_expiration"] > time.time() + 60
+    refresh.assert_called_once_with("refresh")
+
+
+@pytest.mark.django_db
+def test_expired_token_is_refreshed_right_away(middleware, profile, wiki_user):
+    request = make_request(wiki_user, expires_in=-60)
+    with mock.patch(
+        "kuma.users.auth.KumaOIDCAuthenticationBackend.refresh_access_token",
+        return_value={"access_token": "new"},
+    ):
+        middleware.process_request(request)
+    assert request.session["oidc_access_token"] == "new"
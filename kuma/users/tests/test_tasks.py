@@ -1,7 +1,23 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
 import pytest
+import requests
+from django.utils import timezone
+from model_bakery import baker
 
-from kuma.users.models import AccountEvent, UserProfile
-from kuma.users.tasks import process_event_subscription_state_change
+from kuma.bookmarks.models import Bookmark
+from kuma.notifications.models import Notification
+from kuma.users import tasks
+from kuma.users.models import AccountEvent, UserDeletion, UserProfile
+from kuma.users.tasks import (
+    delete_pending_users,
+    delete_user,
+    process_event_subscription_state_change,
+    process_pending_events,
+    schedule_user_deletion,
+)
 
 
 @pytest.mark.django_db
@@ -100,3 +116,256 @@ def test_multiple_valid_subscription_change_takes_first_in_array(wiki_user):
     profile.refresh_from_db()
     # Ensure only first (lexicographical) valid is persisted
     assert profile.subscription_type == "mdn_plus_5m"
+
+
+@pytest.mark.django_db
+def test_process_pending_events_coalesces_per_user(
+    wiki_user, django_user_model, django_capture_on_commit_callbacks
+):
+    profile = UserProfile.objects.create(user=wiki_user)
+    deleted_user = baker.make(django_user_model, username="deleted")
+
+    def event(event_type, payload=None, fxa_uid=wiki_user.username):
+        return AccountEvent.objects.create(
+            event_type=event_type,
+            status=AccountEvent.EventStatus.PENDING,
+            fxa_uid=fxa_uid,
+            payload=json.dumps(payload or {}),
+        )
+
+    subscribed = event(
+        AccountEvent.EventType.SUBSCRIPTION_CHANGED,
+        {"capabilities": ["mdn_plus_5y"], "isActive": True, "changeTime": 2},
+    )
+    unsubscribed = event(
+        AccountEvent.EventType.SUBSCRIPTION_CHANGED,
+        {"capabilities": [], "isActive": False, "changeTime": 1},
+    )
+    profile_changes = [event(AccountEvent.EventType.PROFILE_CHANGED) for _ in range(2)]
+    password_change = event(AccountEvent.EventType.PASSWORD_CHANGED)
+    deletion = event(AccountEvent.EventType.PROFILE_DELETED, fxa_uid="deleted")
+    unknown = event(AccountEvent.EventType.PASSWORD_CHANGED, fxa_uid="unknown")
+
+    with mock.patch(
+        "kuma.users.tasks.update_profile_from_fxa",
+        return_value=AccountEvent.EventStatus.PROCESSED,
+    ) as update_profile_from_fxa, django_capture_on_commit_callbacks(execute=True):
+        process_pending_events()
+    update_profile_from_fxa.assert_called_once()
+
+    profile.refresh_from_db()
+    # The one that changed last is applied, even though it came first.
+    assert profile.is_subscriber
+    assert profile.subscription_type == "mdn_plus_5y"
+    assert not django_user_model.objects.filter(id=deleted_user.id).exists()
+    statuses = dict(AccountEvent.objects.values_list("id", "status"))
+    assert statuses == {
+        subscribed.id: AccountEvent.EventStatus.PROCESSED,
+        unsubscribed.id: AccountEvent.EventStatus.IGNORED,
+        profile_changes[0].id: AccountEvent.EventStatus.PROCESSED,
+        profile_changes[1].id: AccountEvent.EventStatus.PROCESSED,
+        password_change.id: AccountEvent.EventStatus.PROCESSED,
+        deletion.id: AccountEvent.EventStatus.PROCESSED,
+        unknown.id: AccountEvent.EventStatus.IGNORED,
+    }
+
+    # Older changes that arrive later don't undo the latest one.
+    stale = event(
+        AccountEvent.EventType.SUBSCRIPTION_CHANGED,
+        {"capabilities": [], "isActive": False, "changeTime": 1},
+    )
+    process_pending_events()
+    profile.refresh_from_db()
+    assert profile.is_subscriber
+    stale.refresh_from_db()
+    assert stale.status == AccountEvent.EventStatus.IGNORED
+
+
+@pytest.mark.django_db
+def test_process_pending_events_isolates_failures(wiki_user, django_user_model):
+    other_user = baker.make(django_user_model, username="other")
+    broken_user = baker.make(django_user_model, username="broken")
+    for user in (wiki_user, other_user, broken_user):
+        UserProfile.objects.create(user=user)
+
+    def event(fxa_uid, event_type, payload=None):
+        return AccountEvent.objects.create(
+            event_type=event_type,
+            status=AccountEvent.EventStatus.PENDING,
+            fxa_uid=fxa_uid,
+            payload=json.dumps(payload or {}),
+        )
+
+    subscribed = {"capabilities": ["mdn_plus_5y"], "isActive": True, "changeTime": 1}
+    events = {
+        name: (
+            event(name, AccountEvent.EventType.SUBSCRIPTION_CHANGED, subscribed),
+            event(name, AccountEvent.EventType.PROFILE_CHANGED),
+        )
+        for name in (wiki_user.username, "other", "broken")
+    }
+
+    def update_profile_from_fxa(user, profile):
+        if user == wiki_user:
+            raise requests.HTTPError("FxA is down")
+        return AccountEvent.EventStatus.PROCESSED
+
+    original_apply_subscription_state = tasks.apply_subscription_state
+
+    def apply_subscription_state(user, profile, payload):
+        if user == broken_user:
+            raise ValueError("broken")
+        original_apply_subscription_state(user, profile, payload)
+
+    with mock.patch(
+        "kuma.users.tasks.update_profile_from_fxa", update_profile_from_fxa
+    ), mock.patch(
+        "kuma.users.tasks.apply_subscription_state", apply_subscription_state
+    ):
+        process_pending_events()
+
+    statuses = dict(AccountEvent.objects.values_list("id", "status"))
+    # Only the profile of the user whose profile couldn't be fetched fails.
+    assert [statuses[e.id] for e in events[wiki_user.username]] == [
+        AccountEvent.EventStatus.PROCESSED,
+        AccountEvent.EventStatus.FAILED,
+    ]
+    assert [statuses[e.id] for e in events["other"]] == [
+        AccountEvent.EventStatus.PROCESSED,
+        AccountEvent.EventStatus.PROCESSED,
+    ]
+    assert [statuses[e.id] for e in events["broken"]] == [
+        AccountEvent.EventStatus.FAILED,
+        AccountEvent.EventStatus.FAILED,
+    ]
+    assert list(
+        UserProfile.objects.filter(is_subscriber=True).values_list(
+            "user__username", flat=True
+        )
+    ) == [wiki_user.username, "other"]
+
+
+@pytest.mark.django_db
+def test_process_pending_events_reclaims_abandoned_events(wiki_user):
+    claimed = [
+        AccountEvent.objects.create(
+            event_type=AccountEvent.EventType.PASSWORD_CHANGED,
+            status=AccountEvent.EventStatus.PROCESSING,
+            fxa_uid=wiki_user.username,
+        )
+        for _ in range(2)
+    ]
+    AccountEvent.objects.filter(id=claimed[0].id).update(
+        modified_at=timezone.now()
+        - timedelta(seconds=tasks.ACCOUNT_EVENT_CLAIM_TIMEOUT + 1)
+    )
+
+    process_pending_events()
+
+    statuses = dict(AccountEvent.objects.values_list("id", "status"))
+    assert statuses == {
+        claimed[0].id: AccountEvent.EventStatus.PROCESSED,
+        # Another run may still be busy with this one.
+        claimed[1].id: AccountEvent.EventStatus.PROCESSING,
+    }
+
+
+@pytest.mark.django_db
+def test_process_pending_events_renews_claims(monkeypatch, django_user_model):
+    monkeypatch.setattr(tasks, "ACCOUNT_EVENT_CLAIM_TIMEOUT", 0)
+    events = [
+        AccountEvent.objects.create(
+            event_type=AccountEvent.EventType.PASSWORD_CHANGED,
+            status=AccountEvent.EventStatus.PENDING,
+            fxa_uid=baker.make(django_user_model, username=username).username,
+        )
+        for username in ("first", "second")
+    ]
+    claims = []
+    original_process_user_events = tasks.process_user_events
+
+    def process_user_events(user, user_events, last_change_time):
+        claims.append(
+            dict(
+                AccountEvent.objects.filter(
+                    status=AccountEvent.EventStatus.PROCESSING
+                ).values_list("id", "modified_at")
+            )
+        )
+        original_process_user_events(user, user_events, last_change_time)
+
+    monkeypatch.setattr(tasks, "process_user_events", process_user_events)
+    process_pending_events()
+
+    # The claim on the second event was renewed before processing it.
+    assert list(claims[1]) == [events[1].id]
+    assert claims[1][events[1].id] > claims[0][events[1].id]
+
+
+@pytest.mark.django_db
+def test_delete_user_in_batches(
+    wiki_user, settings, django_user_model, django_capture_on_commit_callbacks
+):
+    settings.USER_DELETION_CHUNK_SIZE = 2
+    other_user = baker.make(django_user_model)
+    UserProfile.objects.create(user=wiki_user)
+    baker.make(
+        Bookmark, user=wiki_user, documenturl__metadata={"title": "A"}, _quantity=5
+    )
+    baker.make(Notification, user=wiki_user, _quantity=3)
+    baker.make(Notification, user=other_user)
+
+    with mock.patch.object(
+        delete_user, "delay"
+    ) as delay, django_capture_on_commit_callbacks(execute=True):
+        schedule_user_deletion(wiki_user)
+    delay.assert_called_once_with(wiki_user.id)
+    wiki_user.refresh_from_db()
+    assert not wiki_user.is_active
+    assert UserDeletion.objects.filter(user=wiki_user).exists()
+
+    progress = delete_user(wiki_user.id)
+
+    assert progress == {
+        "admin.logentry": 0,
+        "users.userprofile": 1,
+        "bookmarks.bookmark": 5,
+        "notifications.notification": 3,
+        "notifications.userwatch": 0,
+        "notifications.defaultwatch": 0,
+        "done": True,
+    }
+    assert not django_user_model.objects.filter(id=wiki_user.id).exists()
+    assert not UserDeletion.objects.exists()
+    assert Notification.objects.filter(user=other_user).count() == 1
+
+
+@pytest.mark.django_db
+def test_delete_pending_users_finishes_failed_deletions(
+    wiki_user, settings, django_user_model
+):
+    settings.USER_DELETION_CHUNK_SIZE = 2
+    baker.make(Notification, user=wiki_user, _quantity=3)
+    recent_user = baker.make(django_user_model)
+
+    with mock.patch.object(delete_user, "delay"):
+        schedule_user_deletion(wiki_user)
+        schedule_user_deletion(recent_user)
+    with mock.patch(
+        "kuma.users.tasks.delete_in_batches", side_effect=RuntimeError
+    ), pytest.raises(RuntimeError):
+        delete_user(wiki_user.id)
+    UserDeletion.objects.filter(user=wiki_user).update(
+        created=timezone.now() - timedelta(seconds=tasks.USER_DELETION_RETRY_AFTER + 1)
+    )
+    wiki_user.refresh_from_db()
+    assert not wiki_user.is_active
+
+    delete_pending_users()
+
+    assert not django_user_model.objects.filter(id=wiki_user.id).exists()
+    assert not Notification.objects.exists()
+    # Deletions that just started aren't started again.
+    assert list(UserDeletion.objects.values_list("user_id", flat=True)) == [
+        recent_user.id
+    ]
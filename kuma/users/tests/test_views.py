@@ -1,8 +1,13 @@
 import urllib
+from unittest import mock
 
 import pytest
 from django.urls import reverse
 
+from kuma.users.models import AccountEvent
+from kuma.users.tasks import process_pending_events
+from kuma.users.views import WebhookView
+
 
 @pytest.mark.django_db
 @pytest.mark.parametrize(
@@ -22,3 +27,34 @@ def test_no_prompt_login(client, settings, email):
     if email:
         assert "prompt=none" in location
         assert f"login_hint={email}" in location
+
+
+@pytest.mark.django_db
+def test_webhook_retries_are_ignored(
+    client, settings, wiki_user, django_capture_on_commit_callbacks
+):
+    payload = {
+        "iss": settings.FXA_SET_ISSUER,
+        "sub": wiki_user.username,
+        "jti": "e19ed6c5-4816-4171-aa43-56ffe80dbda1",
+        "iat": 1565720808,
+        "events": {
+            f"{settings.FXA_SET_ID_PREFIX}password-change": {"changeTime": 1},
+            f"{settings.FXA_SET_ID_PREFIX}profile-change": {},
+        },
+    }
+    with mock.patch.object(
+        WebhookView, "verify_token", return_value=payload
+    ), mock.patch.object(
+        process_pending_events, "delay"
+    ) as delay, django_capture_on_commit_callbacks(
+        execute=True
+    ):
+        for _ in range(2):
+            response = client.post(
+                reverse("fxa_webhook"), HTTP_AUTHORIZATION="Bearer token"
+            )
+            assert response.status_code == 202
+
+    assert AccountEvent.objects.filter(jwt_id=payload["jti"]).count() == 2
+    delay.assert_called_once()
@@ -1,4 +1,11 @@
-from kuma.users.models import UserProfile
+from django.core.cache import cache
+
+from kuma.users.models import (
+    PROFILE_CACHE_KEY,
+    PROFILE_CACHE_TIMEOUT,
+    UserDeletion,
+    UserProfile,
+)
 
 
 # Finds union of valid subscription id's from input and UserProfile.SubscriptionType.values
@@ -11,3 +18,27 @@ def get_valid_subscription_type_or_none(input):
         subscription_types.sort()
 
     return subscription_types[0] if len(subscription_types) > 0 else ""
+
+
+def get_profile_data(user_id):
+    """
+    The avatar and subscription of a user, or an empty dict if they don't
+    have a profile, from the cache when possible.
+
+    The cached data is forgotten whenever the profile is saved or deleted.
+    """
+    key = PROFILE_CACHE_KEY.format(user_id)
+    data = cache.get(key)
+    if data is None:
+        data = (
+            UserProfile.objects.filter(user_id=user_id)
+            .values("avatar", "is_subscriber", "subscription_type")
+            .first()
+        ) or {}
+        cache.set(key, data, PROFILE_CACHE_TIMEOUT)
+    return data
+
+
+def is_pending_deletion(user_id):
+    """Whether a user is scheduled to be deleted, but isn't yet."""
+    return UserDeletion.objects.filter(user_id=user_id).exists()
@@ -1,9 +1,9 @@
 import json
 
-import requests
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import SuspiciousOperation
+from django.db import transaction
 from django.http import Http404, HttpResponse
 from django.utils.decorators import method_decorator
 from django.utils.encoding import force_bytes
@@ -16,13 +16,9 @@ from mozilla_django_oidc.views import (
     OIDCAuthenticationRequestView,
 )
 
+from kuma.users.jwks import jwks
 from kuma.users.models import AccountEvent, UserProfile
-from kuma.users.tasks import (
-    process_event_delete_user,
-    process_event_password_change,
-    process_event_profile_change,
-    process_event_subscription_state_change,
-)
+from kuma.users.tasks import process_pending_events
 
 
 class NoPromptOIDCAuthenticationRequestView(OIDCAuthenticationRequestView):
@@ -66,24 +62,8 @@ class WebhookView(View):
     """
 
     def retrieve_matching_jwk(self, header):
-        """Get the signing key by exploring the JWKS endpoint of the OP."""
-
-        response_jwks = requests.get(
-            settings.OIDC_OP_JWKS_ENDPOINT,
-        )
-        response_jwks.raise_for_status()
-        jwks = response_jwks.json()
-
-        key = None
-        for jwk in jwks["keys"]:
-            if jwk["kid"] != header.get("kid"):
-                continue
-            if "alg" in jwk and jwk["alg"] != header["alg"]:
-                raise SuspiciousOperation("alg values do not match.")
-            key = jwk
-        if key is None:
-            raise SuspiciousOperation("Could not find a valid JWKS.")
-        return key
+        """Get the signing key from the (cached) JWKS of the OP."""
+        return jwks.get_matching_jwk(header.get("kid"), header["alg"])
 
     def verify_token(self, token, **kwargs):
         """Validate the token signature."""
@@ -129,6 +109,7 @@ class WebhookView(View):
         if not user:
             return
 
+        account_events = []
         for long_id, event in events.items():
             short_id = long_id.replace(settings.FXA_SET_ID_PREFIX, "")
             if short_id == "password-change":
@@ -145,26 +126,21 @@ class WebhookView(View):
             if not event_type:
                 continue
 
-            account_event = AccountEvent.objects.create(
-                issued_at=payload["iat"],
-                jwt_id=payload["jti"],
-                fxa_uid=fxa_uid,
-                status=AccountEvent.EventStatus.PENDING,
-                payload=json.dumps(event),
-                event_type=event_type,
+            account_events.append(
+                AccountEvent(
+                    issued_at=payload["iat"],
+                    jwt_id=payload["jti"],
+                    fxa_uid=fxa_uid,
+                    status=AccountEvent.EventStatus.PENDING,
+                    payload=json.dumps(event),
+                    event_type=event_type,
+                )
             )
 
-            if user:
-                if event_type == AccountEvent.EventType.PROFILE_DELETED:
-                    process_event_delete_user.delay(account_event.id)
-                elif event_type == AccountEvent.EventType.SUBSCRIPTION_CHANGED:
-                    process_event_subscription_state_change.delay(account_event.id)
-                elif event_type == AccountEvent.EventType.PASSWORD_CHANGED:
-                    process_event_password_change.delay(account_event.id)
-                elif event_type == AccountEvent.EventType.PROFILE_CHANGED:
-                    process_event_profile_change.delay(account_event.id)
-                else:
-                    pass
+        if account_events:
+            # Retries of the same token that race this one are ignored.
+            AccountEvent.objects.bulk_create(account_events, ignore_conflicts=True)
+            transaction.on_commit(process_pending_events.delay)
 
     def post(self, request, *args, **kwargs):
         authorization = request.META.get("HTTP_AUTHORIZATION")
@@ -193,6 +169,10 @@ class WebhookView(View):
             if any([not events, not fxa_uid, exp]):
                 return HttpResponse(status=400)
 
+            # Acknowledge retries of tokens that were already received.
+            if AccountEvent.objects.filter(jwt_id=payload["jti"]).exists():
+                return HttpResponse(status=202)
+
             self.process_events(payload)
 
             return HttpResponse(status=202)